@@ -0,0 +1,52 @@
+# File: benchmarks/compare.py
+"""Compare two benchmark result files stage by stage.
+
+    python -m benchmarks.compare baseline.json candidate.json
+
+Exits with status 1 when any stage is slower than the threshold allows.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+
+def load(path: str) -> Tuple[str, Dict[Tuple[int, int], Dict[str, Any]]]:
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('revision', path), {
+        (result['projects'], result['commits_per_project']): result
+        for result in data['results']
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed slowdown ratio (default: 0.10)')
+    options = parser.parse_args(argv)
+
+    base_revision, baseline = load(options.baseline)
+    cand_revision, candidate = load(options.candidate)
+    print(f"{base_revision} -> {cand_revision}")
+
+    regressed = False
+    for scale in sorted(baseline.keys() & candidate.keys()):
+        for stage, before in baseline[scale]['seconds'].items():
+            after = candidate[scale]['seconds'].get(stage)
+            if after is None or not before:
+                continue
+            change = after / before - 1
+            flag = ''
+            if change > options.threshold:
+                flag = '  REGRESSION'
+                regressed = True
+            print(f"{scale[0]}x{scale[1]} {stage:<18} {before:8.3f}s -> "
+                  f"{after:8.3f}s {change:+7.1%}{flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
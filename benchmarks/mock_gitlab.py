@@ -0,0 +1,303 @@
+# File: benchmarks/mock_gitlab.py
+"""Local mock of the GitLab REST API serving synthetic groups.
+
+Covers the endpoints the extractor uses, with offset and keyset
+pagination, rate limit headers and optional per-request latency.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+AUTHORS = [
+    ('Alice Example', 'alice@example.com'),
+    ('Bob Example', 'bob@example.com'),
+    ('Carol Example', 'carol@example.com'),
+    ('Dan Example', 'dan@example.com'),
+]
+MESSAGES = [
+    'Add reconveyance export', 'Fix date parsing in deed import',
+    'Refactor county lookup', 'Update dependencies', 'WIP', 'fix typo',
+    "Merge branch 'feature' into 'main'", 'Improve lien release report',
+]
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class SyntheticGroup:
+    """Deterministic synthetic group of N projects with M commits each.
+
+    The last `inactive` projects have no commits and were last active
+    before `start`, like the long tail of a large group.
+    """
+
+    def __init__(self, projects: int, commits_per_project: int,
+                 start: str = '2024-01-01T00:00:00+00:00', days: int = 180,
+                 seed: int = 0, inactive: int = 0):
+        self.start = _parse_time(start)
+        self.days = days
+        self.seed = seed
+        self.commits_per_project = commits_per_project
+        self.first_inactive = projects - inactive + 1
+        self.projects = [{
+            'id': project_id,
+            'name': f"project-{project_id}",
+            'path_with_namespace': f"bench/project-{project_id}",
+            'namespace': {'id': 1, 'full_path': 'bench'},
+            'http_url_to_repo':
+                f"https://gitlab.invalid/bench/project-{project_id}.git",
+            'last_activity_at': (
+                self.start + timedelta(days=days)
+                if project_id < self.first_inactive
+                else self.start - timedelta(days=30)).isoformat(),
+        } for project_id in range(1, projects + 1)]
+        self._commits: Dict[int, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def commits(self, project_id: int) -> List[Dict[str, Any]]:
+        """Return a project's commits, newest first like GitLab."""
+        with self._lock:
+            if project_id not in self._commits:
+                self._commits[project_id] = self._generate(project_id)
+            return self._commits[project_id]
+
+    def _generate(self, project_id: int) -> List[Dict[str, Any]]:
+        if project_id >= self.first_inactive:
+            return []
+        rng = random.Random(self.seed * 1_000_003 + project_id)
+        span = self.days * 24 * 3600
+        commits = []
+        for index in range(self.commits_per_project):
+            author_name, author_email = rng.choice(AUTHORS)
+            created_at = self.start + timedelta(seconds=rng.randrange(span))
+            additions = rng.randrange(200)
+            deletions = rng.randrange(100)
+            commits.append({
+                'id': f"{project_id:08x}{index:032x}",
+                'short_id': f"{project_id:08x}",
+                'title': rng.choice(MESSAGES),
+                'message': rng.choice(MESSAGES),
+                'author_name': author_name,
+                'author_email': author_email,
+                'authored_date': created_at.isoformat(),
+                'committed_date': created_at.isoformat(),
+                'created_at': created_at.isoformat(),
+                'stats': {
+                    'additions': additions,
+                    'deletions': deletions,
+                    'total': additions + deletions
+                },
+            })
+        commits.sort(key=lambda commit: commit['created_at'], reverse=True)
+        return commits
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'MockGitLabServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlparse(self.path)
+        query = {key: values[-1]
+                 for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        if parts[:2] != ['api', 'v4']:
+            return self._send(404, {'message': '404 Not Found'})
+
+        try:
+            status, body, headers = self._route(parts[2:], query)
+        except (KeyError, ValueError):
+            status, body, headers = 404, {'message': '404 Not Found'}, {}
+        self._send(status, body, headers)
+
+    def _route(self, parts: List[str], query: Dict[str, str]
+               ) -> Tuple[int, Any, Dict[str, str]]:
+        group = self.server.group
+        if parts == ['user']:
+            return 200, {'id': 1, 'name': 'Benchmark User'}, {}
+        if len(parts) == 2 and parts[0] == 'groups':
+            return 200, {'id': int(parts[1]), 'full_name': 'Benchmark',
+                         'full_path': 'bench'}, {}
+        if len(parts) == 3 and parts[0] == 'groups' and \
+                parts[2] == 'projects':
+            projects = group.projects
+            if 'last_activity_after' in query:
+                after = _parse_time(query['last_activity_after'])
+                projects = [p for p in projects
+                            if _parse_time(p['last_activity_at']) >= after]
+            return self._paginate(projects, query)
+        if len(parts) == 2 and parts[0] == 'projects':
+            project_id = self._project_id(parts[1])
+            for project in group.projects:
+                if project['id'] == project_id:
+                    return 200, project, {}
+            raise KeyError(project_id)
+        if parts == ['users']:
+            search = query.get('search', '').lower()
+            return 200, [{'id': index, 'name': name}
+                         for index, (name, email) in enumerate(AUTHORS, 1)
+                         if search and search == email], {}
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'events':
+            return self._paginate(
+                self._push_events(int(parts[1]), query), query)
+        if len(parts) == 4 and parts[0] == 'projects' and \
+                parts[2:] == ['repository', 'commits']:
+            return self._paginate(self._filter_commits(
+                group.commits(self._project_id(parts[1])), query), query)
+        if len(parts) == 5 and parts[0] == 'projects' and \
+                parts[2:4] == ['repository', 'commits']:
+            for commit in group.commits(self._project_id(parts[1])):
+                if commit['id'] == parts[4]:
+                    return 200, commit, {}
+            raise KeyError(parts[4])
+        raise KeyError(parts)
+
+    def _project_id(self, id_or_path: str) -> int:
+        """Resolve a numeric or URL-encoded path project ID."""
+        if id_or_path.isdigit():
+            return int(id_or_path)
+        path = unquote(id_or_path)
+        for project in self.server.group.projects:
+            if project['path_with_namespace'] == path:
+                return project['id']
+        raise KeyError(path)
+
+    def _push_events(self, user_id: int,
+                     query: Dict[str, str]) -> List[Dict[str, Any]]:
+        """One push event per project the user committed to."""
+        email = AUTHORS[user_id - 1][1]
+        after = _parse_time(query.get('after', '1970-01-01'))
+        events = []
+        for project in self.server.group.projects:
+            commits = [c for c in self.server.group.commits(project['id'])
+                       if c['author_email'] == email
+                       and _parse_time(c['created_at']) > after]
+            if commits:
+                events.append({'action_name': 'pushed to',
+                               'project_id': project['id'],
+                               'created_at': commits[0]['created_at']})
+        return events
+
+    @staticmethod
+    def _filter_commits(commits: List[Dict[str, Any]],
+                        query: Dict[str, str]) -> List[Dict[str, Any]]:
+        if 'since' in query:
+            since = _parse_time(query['since'])
+            commits = [c for c in commits
+                       if _parse_time(c['created_at']) >= since]
+        if 'author' in query:
+            author = query['author'].lower()
+            commits = [c for c in commits
+                       if author in f"{c['author_name']} <{c['author_email']}>".lower()]  # noqa
+        if query.get('with_stats', '').lower() != 'true':
+            commits = [{k: v for k, v in c.items() if k != 'stats'}
+                       for c in commits]
+        return commits
+
+    def _paginate(self, items: List[Any], query: Dict[str, str]
+                  ) -> Tuple[int, Any, Dict[str, str]]:
+        per_page = min(int(query.get('per_page', 20)), 100)
+        if query.get('pagination') == 'keyset':
+            return self._paginate_keyset(items, query, per_page)
+        page = int(query.get('page', 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        headers = {
+            'X-Page': str(page),
+            'X-Per-Page': str(per_page),
+            'X-Next-Page': str(page + 1) if page < total_pages else '',
+            'X-Prev-Page': str(page - 1) if page > 1 else '',
+        }
+        if self.server.send_totals:
+            headers['X-Total'] = str(len(items))
+            headers['X-Total-Pages'] = str(total_pages)
+        if page < total_pages:
+            next_query = urlencode(dict(query, page=page + 1))
+            host = self.headers.get('Host')
+            headers['Link'] = (f'<http://{host}{urlparse(self.path).path}'
+                               f'?{next_query}>; rel="next"')
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+    def _paginate_keyset(self, items: List[Dict[str, Any]],
+                         query: Dict[str, str], per_page: int
+                         ) -> Tuple[int, Any, Dict[str, str]]:
+        """Keyset pages by ascending ID; only a Link header, no counts."""
+        id_after = int(query.get('id_after', 0))
+        items = sorted((item for item in items if item['id'] > id_after),
+                       key=lambda item: item['id'])
+        page, headers = items[:per_page], {}
+        if len(items) > per_page:
+            next_query = urlencode(dict(query, id_after=page[-1]['id']))
+            host = self.headers.get('Host')
+            headers['Link'] = (f'<http://{host}{urlparse(self.path).path}'
+                               f'?{next_query}>; rel="next"')
+        return 200, page, headers
+
+    def _send(self, status: int, body: Any,
+              headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('RateLimit-Limit', '2000')
+        self.send_header('RateLimit-Remaining', '1999')
+        self.send_header('RateLimit-Reset', str(int(time.time()) + 60))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MockGitLabServer(ThreadingHTTPServer):
+    """Local HTTP server speaking the subset of the GitLab API we use.
+
+    Use it as a context manager; `url` is the base URL to hand to
+    GitLabAPI. `latency` adds a fixed delay to every request to mimic a
+    remote instance, and `send_totals=False` leaves out X-Total-Pages the
+    way GitLab does for very large result sets.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, group: SyntheticGroup, latency: float = 0.0,
+                 send_totals: bool = True):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.group = group
+        self.latency = latency
+        self.send_totals = send_totals
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self):
+        with self._count_lock:
+            self.requests += 1
+
+    def __enter__(self) -> 'MockGitLabServer':
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
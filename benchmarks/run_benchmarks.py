@@ -0,0 +1,161 @@
+# File: benchmarks/run_benchmarks.py
+"""End-to-end throughput benchmarks against local GitLab and OpenAI
+stand-ins.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --scales 10x100,50x200 \
+        --output bench_results.json
+
+Each scale is PROJECTSxCOMMITS. Every stage is timed separately and the
+results are written as JSON, which `benchmarks.compare` can diff across
+commits.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.mock_gitlab import MockGitLabServer, SyntheticGroup
+from benchmarks.stub_summarizer import StubSummarizer
+from src.commit_buffer import CommitBuffer
+from src.data_processor import ActivityDataProcessor
+from src.gitlab_api import GitLabAPI
+from src.commit_stats import CommitStatsFetcher
+from src.main import parse_args
+from src.pipeline import iter_fetched_commits
+from src.report_generator import ReportGenerator
+
+
+def parse_scale(value: str) -> Tuple[int, int]:
+    projects, commits = value.lower().split('x')
+    return int(projects), int(commits)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_scale(projects: int, commits_per_project: int,
+              options: argparse.Namespace) -> Dict[str, Any]:
+    """Run every stage once for one scale and return its timings."""
+    group = SyntheticGroup(projects, commits_per_project)
+    with MockGitLabServer(group, latency=options.api_latency) as server, \
+            tempfile.TemporaryDirectory() as output_dir:
+        config = parse_args([
+            '--token', 'benchmark', '--group-id', '1',
+            '--gitlab-url', server.url, '--start-date', '2024-01-01',
+            '--max-concurrency', str(options.max_concurrency),
+        ] + options.extra_args)
+        gitlab = GitLabAPI(
+            private_token=config['token'],
+            gitlab_url=config['gitlab_url'],
+            max_retries=config['max_retries'],
+            pool_size=config['pool_size'],
+            page_concurrency=config['page_concurrency'],
+            commit_stats=not (config['lazy_stats'] or
+                              config['omit_line_stats'])
+        )
+
+        timings = {}
+        start = time.perf_counter()
+        project_list = gitlab.get_group_projects(config['group_ids'][0])
+        buffer = CommitBuffer()
+        for _, rows in iter_fetched_commits(gitlab, project_list, config):
+            buffer.extend(rows or [])
+        if not config['omit_line_stats']:
+            buffer.ensure_stats(CommitStatsFetcher(
+                gitlab, max_workers=config['stats_concurrency']))
+        timings['fetch'] = time.perf_counter() - start
+        gitlab.close()
+
+        summarizer = StubSummarizer(
+            latency=options.summary_latency,
+            max_workers=config['summary_concurrency'])
+        processor = ActivityDataProcessor(summarizer)
+        start = time.perf_counter()
+        commits_df, repo_stats = processor.process_commits(
+            buffer, config['minutes_per_commit'])
+        elapsed = time.perf_counter() - start
+        # Summaries run inside process_commits; report them separately
+        timings['process_commits'] = elapsed - summarizer.seconds
+        timings['summarize'] = summarizer.seconds
+
+        reporter = ReportGenerator(
+            f"{output_dir}/bench", max_workers=config['report_workers'],
+            line_stats=not config['omit_line_stats'])
+        start = time.perf_counter()
+        reporter.generate_reports(commits_df, repo_stats)
+        timings['generate_reports'] = time.perf_counter() - start
+
+        total_commits = len(buffer)
+        return {
+            'projects': projects,
+            'commits_per_project': commits_per_project,
+            'commits': total_commits,
+            'http_requests': server.requests,
+            'summary_requests': summarizer.requests,
+            'seconds': timings,
+            'commits_per_second': {
+                stage: total_commits / seconds if seconds else None
+                for stage, seconds in timings.items()
+            },
+        }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10x100,50x200,200x200',
+                        help='Comma separated PROJECTSxCOMMITS scales')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per scale; the fastest run is kept')
+    parser.add_argument('--api-latency', type=float, default=0.01,
+                        help='Seconds of latency added to each mock request')
+    parser.add_argument('--summary-latency', type=float, default=0.005,
+                        help='Seconds each stub summary request takes')
+    parser.add_argument('--max-concurrency', type=int, default=4)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('extra_args', nargs=argparse.REMAINDER,
+                        help='Extra gitlab-activity options after --')
+    options = parser.parse_args(argv)
+    if options.extra_args[:1] == ['--']:
+        options.extra_args = options.extra_args[1:]
+
+    results = []
+    for scale in options.scales.split(','):
+        projects, commits = parse_scale(scale)
+        runs = [run_scale(projects, commits, options)
+                for _ in range(options.repeat)]
+        best = min(runs, key=lambda run: sum(run['seconds'].values()))
+        results.append(best)
+        stages = ', '.join(f"{stage} {seconds:.3f}s"
+                           for stage, seconds in best['seconds'].items())
+        print(f"{projects}x{commits}: {stages}")
+
+    with open(options.output, 'w') as f:
+        json.dump({
+            'revision': git_revision(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'options': {
+                'api_latency': options.api_latency,
+                'summary_latency': options.summary_latency,
+                'max_concurrency': options.max_concurrency,
+                'extra_args': options.extra_args,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {options.output}")
+
+
+if __name__ == '__main__':
+    main()
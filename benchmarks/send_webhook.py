@@ -0,0 +1,63 @@
+# File: benchmarks/send_webhook.py
+"""Send a GitLab-style push webhook to a running --serve instance.
+
+    python -m benchmarks.send_webhook --project-id 3 --secret s3cret
+
+Commit timestamps default to now; pass --since to announce older commits.
+"""
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+
+def push_payload(project_id: int, timestamp: str,
+                 commits: int = 1) -> Dict[str, Any]:
+    """Build a minimal Push Hook payload."""
+    return {
+        'object_kind': 'push',
+        'project_id': project_id,
+        'total_commits_count': commits,
+        'commits': [{
+            'id': f"{index:040x}",
+            'message': 'Webhook test commit',
+            'timestamp': timestamp,
+        } for index in range(commits)],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080/webhook')
+    parser.add_argument('--project-id', type=int, required=True)
+    parser.add_argument('--secret', default='')
+    parser.add_argument('--since', default='',
+                        help='Timestamp of the pushed commits (default: now)')
+    parser.add_argument('--commits', type=int, default=1)
+    options = parser.parse_args(argv)
+
+    timestamp = options.since or datetime.now(timezone.utc).isoformat()
+    request = urllib.request.Request(
+        options.url,
+        data=json.dumps(push_payload(
+            options.project_id, timestamp, options.commits)).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            'X-Gitlab-Event': 'Push Hook',
+            'X-Gitlab-Token': options.secret,
+        },
+        method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            print(f"{response.status} {response.read().decode('utf-8')}")
+    except urllib.error.HTTPError as e:
+        print(f"{e.code} {e.read().decode('utf-8')}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# File: benchmarks/stub_summarizer.py
+"""Summarizer stand-in that sleeps instead of calling OpenAI."""
+import threading
+import time
+from src.ai_summarizer import CommitSummarizer
+
+
+class StubSummarizer(CommitSummarizer):
+    """CommitSummarizer whose model requests sleep instead of calling
+    OpenAI.
+
+    Everything above the request layer (compaction, chunking, concurrency
+    and the rate budget) is the real code, so timings reflect the engine
+    and not the remote model.
+    """
+
+    def __init__(self, latency: float = 0.05, **kwargs):
+        kwargs.setdefault('mode', 'completion')
+        kwargs.setdefault('requests_per_minute', 0)
+        super().__init__(api_key='stub', **kwargs)
+        self.latency = latency
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        self.seconds = 0.0
+
+    def summarize_many(self, batches):
+        start = time.perf_counter()
+        try:
+            return super().summarize_many(batches)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def _request(self, text: str, instructions: str) -> str:
+        self.budget.acquire()
+        with self._count_lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        return f"Summary of {len(text)} characters"
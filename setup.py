@@ -5,15 +5,19 @@ from setuptools import setup, find_packages
 setup(
     name="gitlab-activity-extractor",
     version="1.0.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     install_requires=[
         'requests',
-        'pandas',
+        'pandas>=2.0',
         'openai>=1.0.0',
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
     entry_points={
         'console_scripts': [
             'gitlab-activity=src.main:main',
+            'gitlab-activity-query=src.query:main',
         ],
     },
     python_requires='>=3.8',
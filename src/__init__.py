@@ -1,8 +1,21 @@
 # File: src/__init__.py
-from .gitlab_api import GitLabAPI
-from .ai_summarizer import CommitSummarizer
-from .data_processor import ActivityDataProcessor
-from .report_generator import ReportGenerator
+# Components are imported on first access so that importing the package
+# (and running the CLI) does not pay for pandas and openai up front.
+_EXPORTS = {
+    'GitLabAPI': '.gitlab_api',
+    'CommitSummarizer': '.ai_summarizer',
+    'ActivityDataProcessor': '.data_processor',
+    'ReportGenerator': '.report_generator',
+}
 
 __all__ = ['GitLabAPI', 'CommitSummarizer',
            'ActivityDataProcessor', 'ReportGenerator']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        value = getattr(import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,67 +1,265 @@
 # File: src/ai_summarizer.py
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
-from openai import OpenAI
+from .metrics import metrics
+from .rate_limiter import RequestBudget
+
+ASSISTANT_INSTRUCTIONS = "Please summarize these git commits, focusing on the main themes and important changes. Be concise but informative. Commits might not be very wordy. Note that this is an application that deals with reconveyance for real estate, try to extract meanings with this additional information."  # noqa
+RUN_INSTRUCTIONS = "Please summarize these git commits, focusing on the main themes and important changes. Be concise but informative."  # noqa
+REDUCE_INSTRUCTIONS = "These are partial summaries of git commits from the same day. Combine them into one summary of the main themes and important changes. Be concise but informative."  # noqa
+SUMMARY_ERROR = "Error generating summary"
+SUMMARY_UNAVAILABLE = "AI summarization not available"
+
+# Messages that carry no information worth summarizing
+TRIVIAL_MESSAGE = re.compile(
+    r"^\s*(merge (branch|remote-tracking branch|pull request|request|tag)\b"
+    r".*|wip|fix(ed|es)? typos?|typo|minor (fix|fixes|changes?)|"
+    r"cleanup|formatting|lint)\W*$",
+    re.IGNORECASE | re.DOTALL)
+CHARS_PER_TOKEN = 4
+SUMMARY_MODES = ('assistant', 'completion')
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def compact_messages(commit_messages: List[str]) -> List[str]:
+    """Drop duplicate and trivial commit messages, keeping their order.
+
+    If every message is trivial the de-duplicated list is kept, so a day
+    made only of merges still gets a summary.
+    """
+    unique = []
+    seen = set()
+    for message in commit_messages:
+        message = message.strip()
+        normalized = " ".join(message.lower().split())
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(message)
+
+    meaningful = [m for m in unique if not TRIVIAL_MESSAGE.match(m)]
+    return meaningful or unique
+
+
+def chunk_messages(messages: List[str], max_tokens: int) -> List[List[str]]:
+    """Split messages into chunks that each fit in `max_tokens`.
+
+    A single message larger than the budget is truncated to fit.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[List[str]] = [[]]
+    used = 0
+    for message in messages:
+        message = message[:max_chars]
+        tokens = estimate_tokens(message)
+        if chunks[-1] and used + tokens > max_tokens:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(message)
+        used += tokens
+    return chunks
 
 
 class CommitSummarizer:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-        self.assistant = self._create_assistant()
+    """Summarize commit messages with OpenAI.
+
+    The client and the assistant are created lazily, the first time a
+    summary is actually requested, so runs that never need one make no
+    OpenAI calls. An assistant ID can be supplied or kept in a file to
+    reuse one assistant across runs; reused assistants are not deleted
+    on cleanup.
+    """
+
+    def __init__(self, api_key: str, model: str = "gpt-4o",
+                 mode: str = "assistant", max_workers: int = 4,
+                 requests_per_minute: float = 60, assistant_id: str = "",
+                 assistant_id_file: str = "",
+                 max_input_tokens: int = 8000):
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode: {mode}")
+        self.api_key = api_key
+        self.model = model
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_input_tokens = max_input_tokens
+        self.budget = RequestBudget(requests_per_minute)
+        self.assistant_id_file = assistant_id_file
+        self.assistant_id = assistant_id or self._read_assistant_id()
+        self._owns_assistant = False
+        self._client = None
+        self._lock = threading.Lock()
+        # Days and their chunks both fan out; this caps requests in flight
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+        # Everything besides the messages that shapes a summary
+        self.instructions = ASSISTANT_INSTRUCTIONS if mode == "completion" \
+            else f"{ASSISTANT_INSTRUCTIONS}\n{RUN_INSTRUCTIONS}"
+
+    @property
+    def client(self):
+        """The OpenAI client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=self.api_key)
+            return self._client
 
-    def _create_assistant(self):
+    def _read_assistant_id(self) -> str:
+        if self.assistant_id_file and os.path.exists(self.assistant_id_file):
+            with open(self.assistant_id_file) as f:
+                return f.read().strip()
+        return ""
+
+    def _get_assistant_id(self) -> str:
+        """Return the assistant ID, creating the assistant if needed."""
+        client = self.client
+        with self._lock:
+            if not self.assistant_id:
+                self.assistant_id = self._create_assistant(client).id
+                if self.assistant_id_file:
+                    with open(self.assistant_id_file, 'w') as f:
+                        f.write(self.assistant_id)
+                else:
+                    self._owns_assistant = True
+            return self.assistant_id
+
+    def _create_assistant(self, client):
         """Create an OpenAI assistant for commit summarization."""
-        models = self.client.models.list()
-        print("Available models:")
-        for model in models:
-            print(f"- {model.id}")
-        print("\nUsing default model: gpt-4o")
+        print(f"Creating summarization assistant using model: {self.model}")
 
-        return self.client.beta.assistants.create(
+        return client.beta.assistants.create(
             name="Git Commit Summarizer",
             description="Summarize git commit messages",
-            model="gpt-4o",
-            instructions="Please summarize these git commits, focusing on the main themes and important changes. Be concise but informative. Commits might not be very wordy. Note that this is an application that deals with reconveyance for real estate, try to extract meanings with this additional information."  # noqa
+            model=self.model,
+            instructions=ASSISTANT_INSTRUCTIONS
         )
 
+    def summarize_many(self, batches: List[List[str]]) -> List[str]:
+        """Summarize several lists of commit messages concurrently.
+
+        Requests run on a bounded worker pool and are spaced by the
+        per-minute budget. Summaries are returned in the input order.
+        """
+        if self.max_workers <= 1 or len(batches) <= 1:
+            return [self.summarize_commits(batch) for batch in batches]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.summarize_commits, batches))
+
     def summarize_commits(self, commit_messages: List[str]) -> str:
-        """Use AI to summarize a list of commit messages."""
+        """Use AI to summarize a list of commit messages.
+
+        Duplicate and trivial messages are dropped first. If the rest is
+        still larger than `max_input_tokens`, it is split into chunks that
+        are summarized in parallel and then merged in a reduce step.
+        """
         if not commit_messages:
             return "No commits to summarize"
 
         try:
-            thread = self.client.beta.threads.create()
-            message = self.client.beta.threads.messages.create(
-                thread_id=thread.id,
-                role="user",
-                content=" ".join(commit_messages)
-            )
-
-            run = self.client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id,
-                assistant_id=self.assistant.id,
-                instructions="Please summarize these git commits, focusing on the main themes and important changes. Be concise but informative."  # noqa
-            )
-
-            print("Run completed with status: " + run.status)
-
-            if run.status == "completed":
-                messages = self.client.beta.threads.messages.list(
-                    thread_id=thread.id)
-                summary = ""
-                for message in messages:
-                    assert message.content[0].type == "text"
-                    summary += message.content[0].text.value + " "
-                return summary
-            else:
-                print(f"Error generating AI summary: {run}")
-                return "Error generating summary"
+            chunks = chunk_messages(
+                compact_messages(commit_messages), self.max_input_tokens)
+            map_instructions = ASSISTANT_INSTRUCTIONS \
+                if self.mode == "completion" else RUN_INSTRUCTIONS
+            summaries = self._map(
+                [" ".join(chunk) for chunk in chunks], map_instructions)
+
+            # Merge partial summaries until they fit in a single request
+            while len(summaries) > 1:
+                groups = chunk_messages(summaries, self.max_input_tokens)
+                if len(groups) >= len(summaries):
+                    # Partial summaries too long to group; merge pairwise
+                    groups = [summaries[i:i + 2]
+                              for i in range(0, len(summaries), 2)]
+                summaries = self._map(
+                    ["\n\n".join(group) for group in groups],
+                    REDUCE_INSTRUCTIONS)
+            return summaries[0]
         except Exception as e:
             print(f"Error generating AI summary: {str(e)}")
-            return "Error generating summary"
+            metrics.increment('summarizer_errors')
+            return SUMMARY_ERROR
+
+    def _map(self, texts: List[str], instructions: str) -> List[str]:
+        """Send one request per text, in parallel when there are several."""
+        def request(text: str) -> str:
+            with self._slots:
+                return self._request(text, instructions)
+
+        if self.max_workers <= 1 or len(texts) <= 1:
+            return [request(text) for text in texts]
+
+        with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(texts))) as executor:
+            return list(executor.map(request, texts))
+
+    def _request(self, text: str, instructions: str) -> str:
+        """Run one summarization request within the rate budget."""
+        waited = self.budget.acquire()
+        if waited:
+            metrics.increment('summarizer_budget_wait_seconds', waited)
+        metrics.increment('summarizer_requests')
+        start = time.perf_counter()
+        try:
+            if self.mode == "completion":
+                return self._summarize_with_completion(text, instructions)
+            return self._summarize_with_assistant(text, instructions)
+        finally:
+            metrics.observe(
+                'summarizer_request_seconds', time.perf_counter() - start)
+
+    def _summarize_with_completion(self, text: str, instructions: str) -> str:
+        """Summarize with a single chat completion request."""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": text}
+            ]
+        )
+        return response.choices[0].message.content or ""
+
+    def _summarize_with_assistant(self, text: str, instructions: str) -> str:
+        """Summarize through an assistant thread and run."""
+        thread = self.client.beta.threads.create()
+        self.client.beta.threads.messages.create(
+            thread_id=thread.id,
+            role="user",
+            content=text
+        )
+
+        run = self.client.beta.threads.runs.create_and_poll(
+            thread_id=thread.id,
+            assistant_id=self._get_assistant_id(),
+            instructions=instructions
+        )
+
+        print("Run completed with status: " + run.status)
+
+        if run.status != "completed":
+            raise RuntimeError(f"Run did not complete: {run}")
+
+        messages = self.client.beta.threads.messages.list(
+            thread_id=thread.id)
+        summary = ""
+        for message in messages:
+            if message.role != "assistant":
+                continue
+            assert message.content[0].type == "text"
+            summary += message.content[0].text.value + " "
+        return summary
 
     def cleanup(self):
         """Clean up AI resources."""
+        if not self._owns_assistant:
+            return
         try:
-            self.client.beta.assistants.delete(self.assistant.id)
+            self.client.beta.assistants.delete(self.assistant_id)
         except Exception as e:
             print(f"Error cleaning up AI assistant: {str(e)}")
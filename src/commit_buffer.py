@@ -0,0 +1,115 @@
+# File: src/commit_buffer.py
+import numpy as np
+import pandas as pd
+from array import array
+from typing import Any, Dict, Iterable, List
+
+
+class _Interner:
+    """Map repeated strings to small integer codes."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CommitBuffer:
+    """Column-oriented accumulator for commit rows.
+
+    Stats are kept in typed arrays and the project and author columns as
+    interned codes, so each commit costs a few machine words instead of a
+    nine-key dict. `to_frame` hands the arrays to pandas without copying
+    them and parses all timestamps in a single vectorized call. Once a
+    frame has been built the buffer is frozen, because the frame shares
+    its memory.
+
+    Rows listed without line stats (``None``) are stored as zeros and
+    remembered, so `ensure_stats` can fill them in before the frame is
+    built.
+    """
+
+    def __init__(self):
+        self.timestamps: List[str] = []
+        self.commit_ids: List[str] = []
+        self.messages: List[str] = []
+        self.additions = array('q')
+        self.deletions = array('q')
+        self.total_changes = array('q')
+        self.project_codes = array('i')
+        self.author_name_codes = array('i')
+        self.author_email_codes = array('i')
+        self._projects = _Interner()
+        self._author_names = _Interner()
+        self._author_emails = _Interner()
+        self.missing_stats = array('q')
+
+    def __len__(self) -> int:
+        return len(self.commit_ids)
+
+    def append(self, commit: Dict[str, Any]):
+        """Add one commit row."""
+        self.timestamps.append(commit['timestamp'])
+        self.commit_ids.append(commit['commit_id'])
+        self.messages.append(commit['message'])
+        if commit['additions'] is None:
+            self.missing_stats.append(len(self.additions))
+            self.additions.append(0)
+            self.deletions.append(0)
+            self.total_changes.append(0)
+        else:
+            self.additions.append(commit['additions'])
+            self.deletions.append(commit['deletions'])
+            self.total_changes.append(commit['total_changes'])
+        self.project_codes.append(self._projects.code(commit['project']))
+        self.author_name_codes.append(
+            self._author_names.code(commit['author_name']))
+        self.author_email_codes.append(
+            self._author_emails.code(commit['author_email']))
+
+    def extend(self, commits: Iterable[Dict[str, Any]]):
+        """Add many commit rows."""
+        for commit in commits:
+            self.append(commit)
+
+    def ensure_stats(self, fetcher):
+        """Fill in missing line stats through a CommitStatsFetcher."""
+        if not self.missing_stats:
+            return
+        projects = self._projects.values
+        stats = fetcher.fetch(
+            (projects[self.project_codes[index]], self.commit_ids[index])
+            for index in self.missing_stats)
+        for index in self.missing_stats:
+            self.additions[index], self.deletions[index], \
+                self.total_changes[index] = stats[self.commit_ids[index]]
+        self.missing_stats = array('q')
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build a DataFrame that shares the buffer's column memory."""
+        def categorical(codes: array, interner: _Interner) -> pd.Categorical:
+            return pd.Categorical.from_codes(
+                np.frombuffer(codes, dtype=np.int32),
+                categories=interner.values)
+
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(
+                self.timestamps, utc=True, format='ISO8601'),
+            'project': categorical(self.project_codes, self._projects),
+            'commit_id': self.commit_ids,
+            'message': self.messages,
+            'additions': np.frombuffer(self.additions, dtype=np.int64),
+            'deletions': np.frombuffer(self.deletions, dtype=np.int64),
+            'total_changes': np.frombuffer(
+                self.total_changes, dtype=np.int64),
+            'author_name': categorical(
+                self.author_name_codes, self._author_names),
+            'author_email': categorical(
+                self.author_email_codes, self._author_emails),
+        }, copy=False)
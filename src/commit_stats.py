@@ -0,0 +1,80 @@
+# File: src/commit_stats.py
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .commit_store import CommitStore
+from .gitlab_api import GitLabAPI
+from .metrics import metrics
+
+# (additions, deletions, total_changes)
+Stats = Tuple[int, int, int]
+
+
+class CommitStatsFetcher:
+    """Fetch line stats of single commits on demand, once per SHA.
+
+    Used with commit listings that leave out stats: only the commits that
+    are actually reported get a stats request. Results are kept by SHA in
+    memory and, with a commit store, written back to the stored commits
+    so later runs do not ask again.
+    """
+
+    def __init__(self, gitlab: GitLabAPI,
+                 store: Optional[CommitStore] = None, max_workers: int = 8):
+        self.gitlab = gitlab
+        self.store = store
+        self.max_workers = max_workers
+        self._cache: Dict[str, Stats] = {}
+
+    def fetch(self, commits: Iterable[Tuple[str, str]]) -> Dict[str, Stats]:
+        """Return stats for (project path, SHA) pairs, keyed by SHA."""
+        wanted = dict((sha, project) for project, sha in commits)
+        missing = [sha for sha in wanted if sha not in self._cache]
+        if missing and self.store:
+            self._cache.update(self.store.get_stats(missing))
+            missing = [sha for sha in missing if sha not in self._cache]
+        metrics.increment('commit_stats_cache_hits',
+                          len(wanted) - len(missing))
+
+        if missing:
+            def request(sha: str) -> Optional[Stats]:
+                try:
+                    stats = self.gitlab.get_commit_stats(wanted[sha], sha)
+                except Exception as e:
+                    print(f"Error fetching stats of {sha[:8]}: {str(e)}")
+                    return None
+                return (stats.get('additions', 0), stats.get('deletions', 0),
+                        stats.get('total', 0))
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fetched = {sha: stats for sha, stats in zip(
+                    missing, executor.map(request, missing)) if stats}
+            metrics.increment('commit_stats_fetched', len(fetched))
+            self._cache.update(fetched)
+            if self.store:
+                self.store.save_stats(fetched)
+
+        # Commits whose stats could not be fetched count as empty
+        return {sha: self._cache.get(sha, (0, 0, 0)) for sha in wanted}
+
+    def fill(self, rows: List[Dict[str, Any]]):
+        """Set the stats of rows that have none, in place."""
+        pending = [row for row in rows if row['additions'] is None]
+        if not pending:
+            return
+        stats = self.fetch((row['project'], row['commit_id'])
+                           for row in pending)
+        for row in pending:
+            row['additions'], row['deletions'], row['total_changes'] = \
+                stats[row['commit_id']]
+
+    def iter_with_stats(self, rows: Iterable[Dict[str, Any]],
+                        batch_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """Pass rows through, filling in stats a batch at a time."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            self.fill(batch)
+            yield from batch
@@ -0,0 +1,322 @@
+# File: src/commit_store.py
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    project_id INTEGER NOT NULL,
+    commit_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    epoch REAL NOT NULL,
+    message TEXT,
+    additions INTEGER,
+    deletions INTEGER,
+    total_changes INTEGER,
+    author_name TEXT,
+    author_email TEXT,
+    patch_id TEXT,
+    duplicate INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, commit_id)
+);
+CREATE INDEX IF NOT EXISTS commits_by_time ON commits (project_id, epoch);
+CREATE INDEX IF NOT EXISTS commits_by_sha ON commits (commit_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project_id INTEGER NOT NULL,
+    author_filter TEXT NOT NULL,
+    path_with_namespace TEXT,
+    synced_since TEXT NOT NULL,
+    high_water_mark TEXT,
+    last_activity_at TEXT,
+    synced_at TEXT,
+    PRIMARY KEY (project_id, author_filter)
+);
+CREATE TABLE IF NOT EXISTS stale_rollups (
+    project_id INTEGER PRIMARY KEY
+);
+"""
+
+# Push payload timestamps and committer dates can disagree slightly
+SINCE_SLACK = timedelta(hours=1)
+# Branches pushed late carry commits dated before the newest one already
+# synced, so later syncs overlap the previous one by this much
+DEFAULT_LOOKBACK = timedelta(days=1)
+
+
+def to_epoch(timestamp: str) -> float:
+    """Convert an ISO 8601 timestamp to UTC epoch seconds.
+
+    Timestamps without an offset (such as --start-date) are taken as UTC,
+    which is how GitLab interprets them.
+    """
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def newest_timestamp(commits: Iterable[Dict[str, Any]],
+                     current: Optional[str] = None) -> Optional[str]:
+    """Return the newest commit timestamp, starting from `current`."""
+    for commit in commits:
+        if current is None or \
+                to_epoch(commit['timestamp']) > to_epoch(current):
+            current = commit['timestamp']
+    return current
+
+
+def _range_filter(project: Dict[str, Any], start_date: str,
+                  author_email: str = "") -> Tuple[str, List[Any]]:
+    """Return a WHERE clause and parameters for a project's run range."""
+    where = "project_id = ? AND epoch >= ?"
+    params: List[Any] = [project['id'], to_epoch(start_date)]
+    if author_email:
+        # Substring match on "Name <email>", like GitLab's author filter
+        where += (" AND instr(lower(author_name || ' <' || "
+                  "author_email || '>'), lower(?)) > 0")
+        params.append(author_email)
+    return where, params
+
+
+class CommitStore:
+    """Local SQLite store of commits with per-project high-water marks.
+
+    Later syncs re-request `lookback` before a project's high-water mark;
+    commits dated earlier than that but pushed after the previous sync
+    are not picked up.
+    """
+
+    def __init__(self, path: str, lookback: timedelta = DEFAULT_LOOKBACK):
+        self.path = path
+        self.lookback = lookback
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self.conn.execute(
+                "PRAGMA table_info(commits)")}
+            if 'patch_id' not in columns:
+                # Stores created before patch-ids were kept
+                self.conn.execute(
+                    "ALTER TABLE commits ADD COLUMN patch_id TEXT")
+            if 'duplicate' not in columns:
+                self.conn.execute(
+                    "ALTER TABLE commits ADD COLUMN "
+                    "duplicate INTEGER NOT NULL DEFAULT 0")
+            state_columns = {row['name'] for row in self.conn.execute(
+                "PRAGMA table_info(sync_state)")}
+            if 'synced_at' not in state_columns:
+                self.conn.execute(
+                    "ALTER TABLE sync_state ADD COLUMN synced_at TEXT")
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self.conn.close()
+
+    def _get_state(self, project_id: int,
+                   author_email: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT * FROM sync_state "
+                "WHERE project_id = ? AND author_filter = ?",
+                (project_id, author_email)
+            ).fetchone()
+
+    def fetch_since(self, project: Dict[str, Any], start_date: str,
+                    author_email: str = "") -> Optional[str]:
+        """Return the `since` to fetch a project from, or None to skip it."""
+        state = self._get_state(project['id'], author_email)
+        if state is None or to_epoch(state['synced_since']) > \
+                to_epoch(start_date):
+            # Never synced, or the requested range starts before it
+            return start_date
+
+        # GitLab updates last_activity_at at most about once an hour, so
+        # an unchanged value only proves nothing was pushed when the last
+        # sync ran well after it
+        last_activity_at = project.get('last_activity_at')
+        if last_activity_at and state['synced_at'] and \
+                last_activity_at == state['last_activity_at'] and \
+                to_epoch(state['synced_at']) - to_epoch(last_activity_at) \
+                >= SINCE_SLACK.total_seconds():
+            return None
+
+        if not state['high_water_mark']:
+            return state['synced_since']
+        # Stored commits inside the overlap are upserted again
+        since = to_epoch(state['high_water_mark']) - \
+            self.lookback.total_seconds()
+        if since <= to_epoch(state['synced_since']):
+            return state['synced_since']
+        return datetime.fromtimestamp(since, timezone.utc).isoformat()
+
+    def save_commits(self, project: Dict[str, Any],
+                     commits: List[Dict[str, Any]], start_date: str,
+                     author_email: str = ""):
+        """Store fetched commits and advance the project's sync state."""
+        self.add_commits(project, commits)
+        self.mark_synced(project, start_date, author_email,
+                         newest_timestamp(commits))
+
+    def add_commits(self, project: Dict[str, Any],
+                    commits: List[Dict[str, Any]]):
+        """Insert or update commit rows without touching sync state.
+
+        Stats already stored are kept when a row arrives without them.
+        """
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO commits (project_id, commit_id, timestamp, "
+                "epoch, message, additions, deletions, total_changes, "
+                "author_name, author_email, patch_id) VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (project_id, commit_id) DO UPDATE SET "
+                "timestamp = excluded.timestamp, epoch = excluded.epoch, "
+                "message = excluded.message, "
+                "additions = coalesce(excluded.additions, additions), "
+                "deletions = coalesce(excluded.deletions, deletions), "
+                "total_changes = "
+                "coalesce(excluded.total_changes, total_changes), "
+                "author_name = excluded.author_name, "
+                "author_email = excluded.author_email, "
+                "patch_id = coalesce(excluded.patch_id, patch_id)",
+                [(project['id'], c['commit_id'], c['timestamp'],
+                  to_epoch(c['timestamp']), c['message'], c['additions'],
+                  c['deletions'], c['total_changes'], c['author_name'],
+                  c['author_email'], c.get('patch_id')) for c in commits]
+            )
+            if commits:
+                self._mark_stale([project['id']])
+
+    def get_stats(self, commit_ids: List[str],
+                  chunk_size: int = 500) -> Dict[str, Tuple[int, int, int]]:
+        """Return the stored line stats of the given commits, if known."""
+        stats = {}
+        for start in range(0, len(commit_ids), chunk_size):
+            chunk = commit_ids[start:start + chunk_size]
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT commit_id, additions, deletions, total_changes "
+                    "FROM commits WHERE additions IS NOT NULL AND "
+                    f"commit_id IN ({', '.join('?' * len(chunk))})",
+                    chunk).fetchall()
+            for row in rows:
+                stats[row['commit_id']] = (
+                    row['additions'], row['deletions'], row['total_changes'])
+        return stats
+
+    def save_stats(self, stats: Dict[str, Tuple[int, int, int]],
+                   chunk_size: int = 500):
+        """Store line stats fetched for commits listed without them."""
+        commit_ids = list(stats)
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE commits SET additions = ?, deletions = ?, "
+                "total_changes = ? WHERE commit_id = ?",
+                [(*values, commit_id) for commit_id, values in stats.items()]
+            )
+            for start in range(0, len(commit_ids), chunk_size):
+                chunk = commit_ids[start:start + chunk_size]
+                rows = self.conn.execute(
+                    "SELECT DISTINCT project_id FROM commits WHERE "
+                    f"commit_id IN ({', '.join('?' * len(chunk))})", chunk)
+                self._mark_stale([row['project_id'] for row in rows])
+
+    def mark_duplicates(self, project: Dict[str, Any], start_date: str,
+                        author_email: str, commit_ids: List[str]):
+        """Flag the project's stored copies that dedup dropped this run.
+
+        Flags of rows in the run's range are reset first, so a commit
+        kept this time (say after --dedup off) counts again.
+        """
+        where, params = _range_filter(project, start_date, author_email)
+        with self._lock, self.conn:
+            flagged = {row['commit_id'] for row in self.conn.execute(
+                f"SELECT commit_id FROM commits WHERE {where} AND duplicate",
+                params)}
+            if flagged == set(commit_ids):
+                return
+            self.conn.execute(
+                f"UPDATE commits SET duplicate = 0 WHERE {where}", params)
+            self.conn.executemany(
+                "UPDATE commits SET duplicate = 1 "
+                "WHERE project_id = ? AND commit_id = ?",
+                [(project['id'], commit_id) for commit_id in commit_ids])
+            self._mark_stale([project['id']])
+
+    def _mark_stale(self, project_ids: List[int]):
+        """Queue projects for a rollup rebuild; call inside a transaction."""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO stale_rollups VALUES (?)",
+            [(project_id,) for project_id in project_ids])
+
+    def stale_rollups(self) -> Set[int]:
+        """Return the projects whose commits changed since their rollups."""
+        with self._lock:
+            return {row['project_id'] for row in self.conn.execute(
+                "SELECT project_id FROM stale_rollups")}
+
+    def mark_synced(self, project: Dict[str, Any], start_date: str,
+                    author_email: str = "",
+                    newest: Optional[str] = None):
+        """Record a completed sync of a project up to its newest commit.
+
+        Call this only once every page of the fetch has been stored, so an
+        interrupted sync is retried from the previous high-water mark.
+        """
+        state = self._get_state(project['id'], author_email)
+
+        synced_since = start_date
+        high_water_mark = newest
+        if state is not None:
+            if to_epoch(state['synced_since']) < to_epoch(start_date):
+                synced_since = state['synced_since']
+            if state['high_water_mark']:
+                high_water_mark = newest_timestamp(
+                    [{'timestamp': state['high_water_mark']}], newest)
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES "
+                "(?, ?, ?, ?, ?, ?, ?)",
+                (project['id'], author_email,
+                 project['path_with_namespace'], synced_since,
+                 high_water_mark, project.get('last_activity_at'),
+                 datetime.now(timezone.utc).isoformat())
+            )
+
+    def load_commits(self, project: Dict[str, Any], start_date: str,
+                     author_email: str = "") -> List[Dict[str, Any]]:
+        """Load a project's stored commits since a date, oldest first."""
+        return list(self.iter_commits(project, start_date, author_email))
+
+    def iter_commits(self, project: Dict[str, Any], start_date: str,
+                     author_email: str = "",
+                     chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream a project's stored commits since a date, oldest first."""
+        where, params = _range_filter(project, start_date, author_email)
+        query = f"SELECT * FROM commits WHERE {where} ORDER BY epoch"
+
+        with self._lock:
+            cursor = self.conn.execute(query, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield {
+                    'timestamp': row['timestamp'],
+                    'project': project['path_with_namespace'],
+                    'commit_id': row['commit_id'],
+                    'message': row['message'],
+                    'additions': row['additions'],
+                    'deletions': row['deletions'],
+                    'total_changes': row['total_changes'],
+                    'author_name': row['author_name'],
+                    'author_email': row['author_email'],
+                    'patch_id': row['patch_id']
+                }
@@ -1,25 +1,103 @@
 # File: src/data_processor.py
 import pandas as pd
-from typing import Dict, Tuple, List, Optional
-from .ai_summarizer import CommitSummarizer
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Tuple, List, Optional, Union
+from .ai_summarizer import CommitSummarizer, SUMMARY_ERROR, SUMMARY_UNAVAILABLE
+from .commit_buffer import CommitBuffer
+from .commit_stats import CommitStatsFetcher
+from .metrics import metrics
+from .summary_cache import SummaryCache
+
+
+def merge_activity_sessions(commits_df: pd.DataFrame,
+                            by_author: bool = False,
+                            seconds: bool = False) -> pd.Series:
+    """Return merged activity minutes per (project, date).
+
+    Each commit covers the interval from `activity_start` to
+    `activity_end`. Overlapping or touching intervals of the same author
+    on the same day are merged into one session by a sorted-interval
+    union, so bursts of commits are not counted more than once. The
+    session lengths are then summed across authors, unless `by_author`
+    asks for minutes per (project, date, author_email). With `seconds`,
+    the unrounded totals are returned in seconds instead.
+    """
+    keys = ['project', 'date', 'author_email']
+    spans = commits_df[keys + ['activity_start', 'activity_end']] \
+        .sort_values(keys + ['activity_start'], kind='stable')
+    by_key = [spans[key] for key in keys]
+
+    # A commit opens a new session when it starts after every earlier
+    # interval of the same author and day has ended.
+    running_end = spans.groupby(
+        by_key, observed=True, sort=False)['activity_end'].cummax()
+    previous_end = running_end.groupby(
+        by_key, observed=True, sort=False).shift()
+    session_id = (previous_end.isna() |
+                  (spans['activity_start'] > previous_end)).cumsum()
+
+    sessions = spans.groupby(session_id.to_numpy(), sort=False).agg(
+        project=('project', 'first'),
+        date=('date', 'first'),
+        author_email=('author_email', 'first'),
+        start=('activity_start', 'min'),
+        end=('activity_end', 'max')
+    )
+    lengths = (sessions['end'] - sessions['start']).dt.total_seconds()
+    group_keys = keys if by_author else keys[:2]
+    if seconds:
+        return lengths.groupby(
+            [sessions[key] for key in group_keys], observed=True).sum()
+    minutes = lengths / 60
+    return minutes.groupby(
+        [sessions[key] for key in group_keys], observed=True
+    ).sum().round().astype('int64')
+
+
+def _add_interval(sessions: List[List[float]], start: float, end: float):
+    """Union an interval into a sorted list of disjoint sessions."""
+    index = bisect_left(sessions, [start, end])
+    # Step back if the previous session reaches into the new interval
+    if index > 0 and sessions[index - 1][1] >= start:
+        index -= 1
+    merge_end = index
+    while merge_end < len(sessions) and sessions[merge_end][0] <= end:
+        start = min(start, sessions[merge_end][0])
+        end = max(end, sessions[merge_end][1])
+        merge_end += 1
+    sessions[index:merge_end] = [[start, end]]
 
 
 class ActivityDataProcessor:
-    def __init__(self, summarizer: Optional[CommitSummarizer] = None):
+    def __init__(self, summarizer: Optional[CommitSummarizer] = None,
+                 summary_cache: Optional[SummaryCache] = None,
+                 stats_fetcher: Optional[CommitStatsFetcher] = None):
         self.summarizer = summarizer
+        self.summary_cache = summary_cache
+        # Fills in line stats of commits listed without them
+        self.stats_fetcher = stats_fetcher
 
     def process_commits(
-        self, commits: List[Dict],
+        self, commits: Union[CommitBuffer, List[Dict]],
         minutes_per_commit: int = 15
     ) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
         """Process commit data and calculate statistics by repository."""
-        if not commits:
+        if not len(commits):
             return pd.DataFrame(), {}
+        metrics.increment('rows_processed', len(commits))
 
         # Create DataFrame from commits
-        commits_df = pd.DataFrame(commits)
-        commits_df['timestamp'] = pd.to_datetime(
-            commits_df['timestamp'], utc=True)
+        if isinstance(commits, CommitBuffer):
+            if self.stats_fetcher:
+                commits.ensure_stats(self.stats_fetcher)
+            commits_df = commits.to_frame()
+        else:
+            if self.stats_fetcher:
+                self.stats_fetcher.fill(commits)
+            commits_df = pd.DataFrame(commits)
+            commits_df['timestamp'] = pd.to_datetime(
+                commits_df['timestamp'], utc=True)
         commits_df = commits_df.sort_values('timestamp')
 
         # Calculate activity times
@@ -29,31 +107,133 @@ class ActivityDataProcessor:
         commits_df['activity_end'] = commits_df['timestamp']
         commits_df['date'] = commits_df['timestamp'].dt.date
 
-        # Group by repository and calculate stats
+        # One grouping pass over (project, date) for every repository
+        daily_df = commits_df.groupby(
+            ['project', 'date'], observed=True, sort=True
+        ).agg(
+            commit_id=('commit_id', 'count'),
+            additions=('additions', 'sum'),
+            deletions=('deletions', 'sum'),
+            total_changes=('total_changes', 'sum'),
+            message=('message', list)
+        )
+        daily_df.insert(1, 'activity_minutes', merge_activity_sessions(
+            commits_df).reindex(daily_df.index, fill_value=0))
+
+        return commits_df, self._build_repo_stats(daily_df)
+
+    def process_commit_stream(
+        self, commits: Iterable[Dict[str, Any]],
+        minutes_per_commit: int = 15
+    ) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """Aggregate commits incrementally as they stream in.
+
+        Only per-(project, date) totals and the messages needed for
+        summaries are kept, so memory does not grow with every commit's
+        full record. Activity sessions are merged as commits arrive, in
+        the same way as `merge_activity_sessions`. No detailed commit frame
+        is built; the returned DataFrame is empty.
+        """
+        window = timedelta(minutes=minutes_per_commit).total_seconds()
+        aggregates: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        for commit in commits:
+            timestamp = datetime.fromisoformat(
+                commit['timestamp'].replace('Z', '+00:00'))
+            timestamp = timestamp.astimezone(timezone.utc)
+            key = (commit['project'], timestamp.date())
+            day = aggregates.get(key)
+            if day is None:
+                day = aggregates[key] = {
+                    'commit_id': 0, 'additions': 0, 'deletions': 0,
+                    'total_changes': 0, 'message': [], 'sessions': {}
+                }
+            metrics.increment('rows_processed')
+            day['commit_id'] += 1
+            # Rows listed without stats count as no changed lines
+            day['additions'] += commit['additions'] or 0
+            day['deletions'] += commit['deletions'] or 0
+            day['total_changes'] += commit['total_changes'] or 0
+            day['message'].append((timestamp, commit['message']))
+            end = timestamp.timestamp()
+            _add_interval(
+                day['sessions'].setdefault(commit['author_email'], []),
+                end - window, end)
+
+        if not aggregates:
+            return pd.DataFrame(), {}
+
+        rows = []
+        for (project, date), day in aggregates.items():
+            # Pages arrive newest first; summaries read oldest first
+            day['message'].sort(key=lambda item: item[0])
+            session_seconds = sum(
+                end - start for sessions in day['sessions'].values()
+                for start, end in sessions)
+            rows.append({
+                'project': project,
+                'date': date,
+                'commit_id': day['commit_id'],
+                'activity_minutes': round(session_seconds / 60),
+                'additions': day['additions'],
+                'deletions': day['deletions'],
+                'total_changes': day['total_changes'],
+                'message': [message for _, message in day['message']]
+            })
+        aggregates.clear()
+
+        daily_df = pd.DataFrame(rows).set_index(['project', 'date'])
+        return pd.DataFrame(), self._build_repo_stats(daily_df.sort_index())
+
+    def _build_repo_stats(
+            self, daily_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Summarize every (repo, date) row and split the stats by repo."""
+        # Generate AI summaries if available
+        if self.summarizer:
+            with metrics.phase('summarize'):
+                daily_df['commit_summary'] = self._summarize_all(
+                    daily_df['message'].tolist())
+        else:
+            daily_df['commit_summary'] = SUMMARY_UNAVAILABLE
+
+        daily_df.columns = [
+            'commits', 'activity_minutes',
+            'additions', 'deletions', 'total_changes',
+            'commit_messages', 'commit_summary'
+        ]
+
         repo_stats = {}
-        for repo_name, repo_commits in commits_df.groupby('project'):
-            daily_stats = repo_commits.groupby('date').agg({
-                'commit_id': 'count',
-                'activity_minutes': 'sum',
-                'additions': 'sum',
-                'deletions': 'sum',
-                'total_changes': 'sum',
-                'message': list
-            }).reset_index()
-
-            # Generate AI summaries if available
-            if self.summarizer:
-                daily_stats['commit_summary'] = daily_stats['message'].apply(
-                    self.summarizer.summarize_commits)
-            else:
-                daily_stats['commit_summary'] = "AI summarization not available"  # noqa
-
-            daily_stats.columns = [
-                'date', 'commits', 'activity_minutes',
-                'additions', 'deletions', 'total_changes',
-                'commit_messages', 'commit_summary'
-            ]
-
-            repo_stats[repo_name] = daily_stats
-
-        return commits_df, repo_stats
+        for repo_name, daily_stats in daily_df.groupby(
+                level='project', observed=True, sort=False):
+            daily_stats = daily_stats.reset_index(level='project', drop=True)
+            repo_stats[repo_name] = daily_stats.reset_index()
+        return repo_stats
+
+    def _summarize_all(self, message_lists: List[List[str]]) -> List[str]:
+        """Summarize each day's messages, calling the API only on misses.
+
+        Cache misses are sent to the summarizer as one concurrent batch and
+        mapped back to their rows by position.
+        """
+        summaries: List[Optional[str]] = [None] * len(message_lists)
+        keys: Dict[int, str] = {}
+        misses = []
+        for index, commit_messages in enumerate(message_lists):
+            if self.summary_cache:
+                keys[index] = SummaryCache.key(
+                    commit_messages, self.summarizer.model,
+                    self.summarizer.instructions)
+                summaries[index] = self.summary_cache.get(keys[index])
+            if summaries[index] is None:
+                misses.append(index)
+        if self.summary_cache:
+            metrics.increment(
+                'summary_cache_hits', len(message_lists) - len(misses))
+            metrics.increment('summary_cache_misses', len(misses))
+
+        results = self.summarizer.summarize_many(
+            [message_lists[index] for index in misses])
+        for index, summary in zip(misses, results):
+            summaries[index] = summary
+            if self.summary_cache and summary != SUMMARY_ERROR:
+                self.summary_cache.put(keys[index], summary)
+        return summaries
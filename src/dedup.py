@@ -0,0 +1,107 @@
+# File: src/dedup.py
+import hashlib
+import math
+import threading
+from typing import Any, Dict, Iterable, Iterator, List
+from .metrics import metrics
+
+DEDUP_MODES = ('off', 'sha', 'patch-id')
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+def commit_fingerprint(commit: Dict[str, Any]) -> str:
+    """Approximate a patch-id from the fields the commits API returns.
+
+    Cherry-picked and rebased copies keep their author, author date,
+    message and line counts, so these stand in for the diff the API does
+    not send.
+    """
+    stats = commit.get('stats', {})
+    parts = (commit['author_email'].lower(),
+             commit.get('authored_date') or commit['created_at'],
+             commit['message'].strip(),
+             str(stats.get('additions', 0)), str(stats.get('deletions', 0)))
+    return hashlib.blake2b(
+        '\0'.join(parts).encode('utf-8'), digest_size=20).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set of 16-byte digests.
+
+    Membership tests can return false positives at about `error_rate`
+    once `capacity` items have been added, but never false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of the digest
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(digest))
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+
+class CommitDeduplicator:
+    """Drop commit rows already seen in this run.
+
+    Rows are keyed on their SHA, and in `patch-id` mode also on their
+    `patch_id`, so cherry-picks and rebased copies count once. Keys are
+    kept as 16-byte digests in a set, or in a Bloom filter when
+    `bloom_capacity` is given for histories too large to hold exactly.
+    The first copy in arrival order is kept; the SHAs of dropped rows
+    are kept per project in `dropped` so stored copies can be flagged.
+    """
+
+    def __init__(self, mode: str = 'sha', bloom_capacity: int = 0,
+                 error_rate: float = 0.001):
+        if mode not in DEDUP_MODES[1:]:
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.mode = mode
+        self.seen = BloomFilter(bloom_capacity, error_rate) \
+            if bloom_capacity else set()
+        self.duplicates = 0
+        self.dropped: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, row: Dict[str, Any]) -> List[bytes]:
+        keys = [_digest(row['commit_id'])]
+        if self.mode == 'patch-id' and row.get('patch_id'):
+            keys.append(_digest(f"patch:{row['patch_id']}"))
+        return keys
+
+    def is_new(self, row: Dict[str, Any]) -> bool:
+        """Record a row, returning False if it duplicates an earlier one."""
+        keys = self._keys(row)
+        with self._lock:
+            if any(key in self.seen for key in keys):
+                self.duplicates += 1
+                self.dropped.setdefault(row['project'], []).append(
+                    row['commit_id'])
+                metrics.increment('duplicate_commits')
+                return False
+            for key in keys:
+                self.seen.add(key)
+        return True
+
+    def filter(self, rows: Iterable[Dict[str, Any]]
+               ) -> Iterator[Dict[str, Any]]:
+        """Yield only the rows not seen before."""
+        for row in rows:
+            if self.is_new(row):
+                yield row
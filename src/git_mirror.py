@@ -0,0 +1,209 @@
+# File: src/git_mirror.py
+import base64
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from .metrics import metrics
+
+# Separators that cannot appear in names, emails or dates
+RECORD = '\x1e'
+FIELD = '\x1f'
+LOG_FORMAT = \
+    f"{RECORD}%H{FIELD}%an{FIELD}%ae{FIELD}%aI{FIELD}%cI{FIELD}%B{FIELD}"
+PAGE_SIZE = 100
+
+
+class GitMirror:
+    """Commit source reading local bare mirrors instead of the REST API.
+
+    Each project's `http_url_to_repo` is cloned once into `mirror_dir` and
+    brought up to date with an incremental `git fetch` on later runs.
+    Commits come from `git log --numstat`, parsed as it streams, in the
+    same shape and pages as `GitLabAPI.iter_project_commits`. With
+    `patch_ids`, commits with a diff also carry their
+    `git patch-id --stable`.
+    """
+
+    def __init__(self, mirror_dir: str, private_token: str = "",
+                 debug: bool = False, patch_ids: bool = False):
+        self.mirror_dir = mirror_dir
+        self.private_token = private_token
+        self.debug = debug
+        self.patch_ids = patch_ids
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(self.mirror_dir, exist_ok=True)
+
+    def close(self):
+        """Nothing to release; present for parity with GitLabAPI."""
+
+    def debug_print(self, message: str):
+        """Print debug messages if debug mode is enabled."""
+        if self.debug:
+            print(f"DEBUG: {message}")
+
+    def _env(self) -> Dict[str, str]:
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        if self.private_token:
+            # Passed through the environment so the token never shows up
+            # in process listings or the mirror's config
+            credentials = base64.b64encode(
+                f"oauth2:{self.private_token}".encode()).decode()
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.extraHeader',
+                'GIT_CONFIG_VALUE_0': f"Authorization: Basic {credentials}",
+            })
+        return env
+
+    def _git(self, args: List[str], repo: Optional[str] = None):
+        command = ['git'] + (['--git-dir', repo] if repo else []) + args
+        result = subprocess.run(command, env=self._env(),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"{' '.join(command[:4])} failed: {result.stderr.strip()}")
+        return result
+
+    def _lock(self, project_id: int) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(project_id, threading.Lock())
+
+    def mirror_path(self, project: Dict[str, Any]) -> str:
+        """Return the path of a project's bare mirror."""
+        return os.path.join(self.mirror_dir, f"{project['id']}.git")
+
+    def update(self, project: Dict[str, Any]) -> str:
+        """Create or incrementally fetch a project's mirror."""
+        repo = self.mirror_path(project)
+        with self._lock(project['id']):
+            start = time.perf_counter()
+            if not os.path.exists(repo):
+                self.debug_print(f"Cloning {project['path_with_namespace']}")
+                self._git(['init', '--quiet', '--bare', repo])
+            self._git(['fetch', '--quiet', '--prune', '--no-tags',
+                       project['http_url_to_repo'],
+                       '+refs/heads/*:refs/heads/*',
+                       '+refs/tags/*:refs/tags/*'], repo)
+            metrics.increment('git_fetches')
+            metrics.observe('git_fetch_seconds', time.perf_counter() - start)
+        return repo
+
+    def iter_project_commits(self, project: Dict[str, Any],
+                             since: str = "", author_email: str = ""
+                             ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a project's commits in pages, newest first."""
+        repo = self.update(project)
+        filters = []
+        if since:
+            filters.append(f"--since={since}")
+        if author_email:
+            # GitLab matches the author filter as a case-insensitive
+            # substring of "name <email>"
+            filters += ['--fixed-strings', '--regexp-ignore-case',
+                        f"--author={author_email}"]
+        patch_ids = self._patch_ids(repo, filters) if self.patch_ids else {}
+        args = ['log', '--all', '--numstat', '--diff-merges=first-parent',
+                f"--format={LOG_FORMAT}"] + filters
+
+        process = subprocess.Popen(
+            ['git', '--git-dir', repo] + args, env=self._env(),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace')
+        try:
+            page = []
+            for commit in parse_log(process.stdout):
+                if commit['id'] in patch_ids:
+                    commit['patch_id'] = patch_ids[commit['id']]
+                page.append(commit)
+                if len(page) >= PAGE_SIZE:
+                    yield page
+                    page = []
+            if page:
+                yield page
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            if process.wait() != 0 and stderr:
+                # An empty mirror has no commits to log
+                if 'does not have any commits' not in stderr:
+                    raise RuntimeError(f"git log failed: {stderr.strip()}")
+
+    def _patch_ids(self, repo: str, filters: List[str]) -> Dict[str, str]:
+        """Map commit SHAs to patch-ids; empty commits get none."""
+        log = subprocess.Popen(
+            ['git', '--git-dir', repo, 'log', '--all', '-p',
+             '--diff-merges=first-parent', '--format=commit %H'] + filters,
+            env=self._env(), stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+        try:
+            result = subprocess.run(
+                ['git', 'patch-id', '--stable'], stdin=log.stdout,
+                capture_output=True, text=True)
+        finally:
+            log.stdout.close()
+            log.wait()
+        patch_ids = {}
+        for line in result.stdout.splitlines():
+            patch_id, sha = line.split()
+            patch_ids[sha] = patch_id
+        return patch_ids
+
+    def get_project_commits(self, project: Dict[str, Any],
+                            since: str = "",
+                            author_email: str = "") -> List[Dict[str, Any]]:
+        """Get all commits for a specific project."""
+        commits = []
+        for batch in self.iter_project_commits(project, since, author_email):
+            commits.extend(batch)
+        return commits
+
+
+def parse_log(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse `git log --numstat` output in LOG_FORMAT, one commit at a time.
+
+    Commits are returned in the shape of the GitLab commits API with
+    `with_stats`, so rows are built the same way from either source.
+    """
+    commit = None
+    header = None
+    for line in lines:
+        if line.startswith(RECORD):
+            if commit:
+                yield commit
+            commit = None
+            header = line[1:]
+        elif header is not None:
+            header += line
+        elif commit is not None and line.strip():
+            added, deleted, _ = line.split('\t', 2)
+            # Binary files are reported as "-"
+            additions = int(added) if added.isdigit() else 0
+            deletions = int(deleted) if deleted.isdigit() else 0
+            stats = commit['stats']
+            stats['additions'] += additions
+            stats['deletions'] += deletions
+            stats['total'] += additions + deletions
+
+        if header is not None and header.count(FIELD) >= 6:
+            sha, name, email, authored, date, body, _ = \
+                header.split(FIELD, 6)
+            message = body.strip('\n')
+            commit = {
+                'id': sha,
+                'short_id': sha[:8],
+                'title': message.split('\n', 1)[0],
+                'message': message,
+                'author_name': name,
+                'author_email': email,
+                'authored_date': authored,
+                'created_at': date,
+                'committed_date': date,
+                'stats': {'additions': 0, 'deletions': 0, 'total': 0},
+            }
+            header = None
+    if commit:
+        yield commit
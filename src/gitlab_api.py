@@ -1,29 +1,214 @@
 # File: src/gitlab_api.py
 import requests
-from time import sleep
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from time import perf_counter, sleep
+from typing import List, Dict, Any, Iterator, Optional, Set
 import sys
+from urllib.parse import quote
+from .http_cache import ResponseCache
+from .metrics import metrics, PAGE_BUCKETS
+from .rate_limiter import RateLimiter
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Project listings support keyset pagination ordered by ID
+KEYSET_PROJECTS = {'pagination': 'keyset', 'order_by': 'id', 'sort': 'asc'}
 
 
 class GitLabAPI:
     def __init__(
             self, private_token: str, gitlab_url: str = "https://gitlab.com",
-            debug: bool = False):
+            debug: bool = False, max_retries: int = 5,
+            rate_limiter: Optional[RateLimiter] = None,
+            pool_size: int = 16, cache_dir: str = "",
+            page_concurrency: int = 4, commit_stats: bool = True):
         self.gitlab_url = gitlab_url.rstrip('/')
         self.headers = {'PRIVATE-TOKEN': private_token}
         self.debug = debug
+        self.max_retries = max_retries
+        self.page_concurrency = page_concurrency
+        # Without stats, listings are cheap and stats come per commit later
+        self.commit_stats = commit_stats
+        self.rate_limiter = rate_limiter or RateLimiter(debug=debug)
+        self.response_cache = ResponseCache(cache_dir) if cache_dir else None
+
+        # One keep-alive connection pool shared by all fetch threads
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self):
+        """Close pooled HTTP connections."""
+        self.session.close()
 
     def debug_print(self, message: str):
         """Print debug messages if debug mode is enabled."""
         if self.debug:
             print(f"DEBUG: {message}")
 
+    def _get(self, url: str,
+             params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """GET a URL, retrying rate limited, server and connection errors."""
+        cached = None
+        conditional_headers = None
+        if self.response_cache:
+            cached = self.response_cache.get(url, params)
+            if cached:
+                conditional_headers = ResponseCache.validators(cached)
+
+        attempt = 0
+        while True:
+            waited = self.rate_limiter.wait()
+            if waited:
+                metrics.increment('rate_limit_wait_seconds', waited)
+            metrics.increment('gitlab_requests')
+            start = perf_counter()
+            try:
+                response = self.session.get(
+                    url, headers=conditional_headers, params=params)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                metrics.increment('gitlab_connection_errors')
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.rate_limiter.backoff(attempt)
+                self.debug_print(f"{e}; retrying in {delay:.2f}s")
+                metrics.increment('gitlab_retries')
+                metrics.increment('retry_backoff_seconds', delay)
+                sleep(delay)
+                attempt += 1
+                continue
+
+            metrics.observe('gitlab_request_seconds', perf_counter() - start)
+            metrics.increment('gitlab_response_bytes', len(response.content))
+            self.rate_limiter.update(response.headers)
+            if response.status_code in RETRY_STATUS_CODES \
+                    and attempt < self.max_retries:
+                metrics.increment('gitlab_retries')
+                # A Retry-After header already paused the shared limiter;
+                # otherwise back off on our own.
+                if RateLimiter.retry_after(response.headers) is None:
+                    delay = self.rate_limiter.backoff(attempt)
+                    self.debug_print(f"HTTP {response.status_code} for {
+                                     url}; retrying in {delay:.2f}s")
+                    metrics.increment('retry_backoff_seconds', delay)
+                    sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code == 304 and cached:
+                self.debug_print(f"Not modified: {url}")
+                metrics.increment('http_cache_not_modified')
+                return ResponseCache.to_response(cached, response)
+
+            response.raise_for_status()
+            if self.response_cache:
+                self.response_cache.put(url, params, response)
+            return response
+
+    def _iter_pages(self, url: str, params: Dict[str, Any],
+                    keyset: Optional[Dict[str, Any]] = None
+                    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the pages of a paginated endpoint in order.
+
+        When the first response reports X-Total-Pages, the remaining pages
+        are fetched in parallel. GitLab omits the totals for very large
+        result sets, and stops serving offset pages past its offset limit;
+        endpoints that support it then pass `keyset` parameters and the
+        listing is re-issued with keyset pagination. Otherwise the
+        Link/X-Next-Page headers are followed, and servers that send
+        neither are probed until a short page comes back.
+        """
+        response = self._get(url, dict(params, page=1))
+        batch = response.json()
+        total_pages = _header_int(response.headers, 'X-Total-Pages')
+        if total_pages is None and keyset and batch:
+            self.debug_print(f"No page totals for {url}; using keyset pagination")  # noqa
+            yield from self._iter_keyset_pages(url, dict(params, **keyset))
+            return
+        params = dict(params, page=1)
+
+        if not batch:
+            return
+        yield batch
+
+        if total_pages is not None:
+            yield from self._fetch_pages(
+                url, params, range(2, total_pages + 1))
+            return
+
+        page = 1
+        while True:
+            next_url = response.links.get('next', {}).get('url')
+            if next_url:
+                response = self._get(next_url)
+            elif 'X-Next-Page' in response.headers:
+                next_page = _header_int(response.headers, 'X-Next-Page')
+                if next_page is None:
+                    return
+                response = self._get(url, dict(params, page=next_page))
+            elif len(batch) >= params['per_page']:
+                page += 1
+                response = self._get(url, dict(params, page=page))
+            else:
+                return
+
+            batch = response.json()
+            if not batch:
+                return
+            yield batch
+
+    def _iter_keyset_pages(self, url: str, params: Dict[str, Any]
+                           ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield keyset-paginated pages by following their Link headers."""
+        response = self._get(url, params)
+        while True:
+            batch = response.json()
+            if not batch:
+                return
+            yield batch
+            next_url = response.links.get('next', {}).get('url')
+            if not next_url:
+                return
+            response = self._get(next_url)
+
+    def _fetch_pages(self, url: str, params: Dict[str, Any],
+                     pages: range) -> Iterator[List[Dict[str, Any]]]:
+        """Fetch known page numbers concurrently, yielding them in order."""
+        def fetch(page: int) -> List[Dict[str, Any]]:
+            return self._get(url, dict(params, page=page)).json()
+
+        if self.page_concurrency <= 1 or len(pages) <= 1:
+            for page in pages:
+                yield fetch(page)
+            return
+
+        # Keep a bounded window of requests in flight so pages can be
+        # consumed as they arrive without buffering the whole result set
+        window = self.page_concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.page_concurrency) as executor:
+            pending = deque()
+            page_iter = iter(pages)
+            for page in page_iter:
+                pending.append(executor.submit(fetch, page))
+                if len(pending) >= window:
+                    break
+            while pending:
+                yield pending.popleft().result()
+                for page in page_iter:
+                    pending.append(executor.submit(fetch, page))
+                    break
+
     def test_authentication(self) -> bool:
         """Test if the token has correct permissions."""
         url = f"{self.gitlab_url}/api/v4/user"
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            response = self._get(url)
             print(f"Successfully authenticated as: {response.json()['name']}")
             return True
         except Exception as e:
@@ -34,87 +219,118 @@ class GitLabAPI:
         """Get group information to verify access."""
         url = f"{self.gitlab_url}/api/v4/groups/{group_id}"
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            response = self._get(url)
             return response.json()
         except Exception as e:
             print(f"Error accessing group {group_id}: {str(e)}")
             sys.exit(1)
 
-    def get_group_projects(self, group_id: int) -> List[Dict[str, Any]]:
-        """Get all projects in a group and its subgroups."""
+    def get_group_projects(self, group_id: int,
+                           last_activity_after: str = ""
+                           ) -> List[Dict[str, Any]]:
+        """Get all projects in a group and its subgroups.
+
+        `simple` listings carry every field we use (id, paths, repository
+        URL and last activity) at a fraction of the full payload. With
+        `last_activity_after`, projects idle since then are left out by
+        the server.
+        """
         projects = []
-        page = 1
-        while True:
-            url = f"{self.gitlab_url}/api/v4/groups/{group_id}/projects"
-            params = {
-                'page': page,
-                'per_page': 100,
-                'include_subgroups': True,
-                'archived': False,
-                'simple': False
-            }
-            try:
-                response = requests.get(
-                    url, headers=self.headers, params=params)
-                response.raise_for_status()
-                batch = response.json()
-                if not batch:
-                    break
+        url = f"{self.gitlab_url}/api/v4/groups/{group_id}/projects"
+        params = {
+            'per_page': 100,
+            'include_subgroups': True,
+            'archived': False,
+            'simple': True
+        }
+        if last_activity_after:
+            params['last_activity_after'] = last_activity_after
+        try:
+            for batch in self._iter_pages(url, params, KEYSET_PROJECTS):
                 projects.extend(batch)
-                page += 1
-                sleep(0.5)
-            except Exception as e:
-                print(f"Error fetching projects page {page}: {str(e)}")
-                break
+        except Exception as e:
+            print(f"Error fetching projects for group {group_id}: {str(e)}")
+            raise
         return projects
 
+    def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        """Return a single project, or None if it is missing or hidden."""
+        url = f"{self.gitlab_url}/api/v4/projects/{project_id}"
+        try:
+            return self._get(url).json()
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+    def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Return the user with this public (or, for admins, any) email."""
+        url = f"{self.gitlab_url}/api/v4/users"
+        users = self._get(url, {'search': email}).json()
+        return users[0] if len(users) == 1 else None
+
+    def get_pushed_project_ids(self, user_id: int, after: str) -> Set[int]:
+        """Return IDs of projects the user pushed to after a date."""
+        url = f"{self.gitlab_url}/api/v4/users/{user_id}/events"
+        params = {'per_page': 100, 'action': 'pushed', 'after': after}
+        project_ids = set()
+        for batch in self._iter_pages(url, params):
+            project_ids.update(event['project_id'] for event in batch
+                               if event.get('project_id'))
+        return project_ids
+
+    def iter_project_commits(self, project: Dict[str, Any],
+                             since: str = "", author_email: str = ""
+                             ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a project's commits one page at a time as they arrive."""
+        url = f"{
+            self.gitlab_url}/api/v4/projects/{project['id']}/repository/commits"  # noqa
+        params = {
+            'per_page': 100,
+            'with_stats': self.commit_stats,
+            'all': True
+        }
+        if since:
+            params['since'] = since
+        if author_email:
+            params['author'] = author_email
+
+        pages = 0
+        try:
+            for batch in self._iter_pages(url, params):
+                if not pages:
+                    self.debug_print(f"First commit: {batch[0]['id']}")
+                pages += 1
+                yield batch
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 404:
+                print(f"Project {project['path_with_namespace']} (ID: {
+                      project['id']}) not found or no access.")
+            else:
+                raise
+        finally:
+            metrics.observe('pages_per_project', pages, PAGE_BUCKETS)
+
     def get_project_commits(self, project: Dict[str, Any],
                             since: str = "",
                             author_email: str = "") -> List[Dict[str, Any]]:
         """Get all commits for a specific project."""
         commits = []
-        page = 1
-
-        while True:
-            url = f"{
-                self.gitlab_url}/api/v4/projects/{project['id']}/repository/commits"  # noqa
-            params = {
-                'page': page,
-                'per_page': 100,
-                'with_stats': True,
-                'all': True
-            }
-            if since:
-                params['since'] = since
-            if author_email:
-                params['author'] = author_email
+        for batch in self.iter_project_commits(project, since, author_email):
+            commits.extend(batch)
+        return commits
 
-            try:
-                response = requests.get(
-                    url, headers=self.headers, params=params)
-                response.raise_for_status()
-                batch = response.json()
-
-                if page == 1 and batch:
-                    print(f"First commit: {batch[0]['id']}")
-                if not batch:
-                    break
+    def get_commit_stats(self, project_path: str,
+                         sha: str) -> Dict[str, int]:
+        """Get the line stats of a single commit."""
+        url = f"{self.gitlab_url}/api/v4/projects/{
+            quote(project_path, safe='')}/repository/commits/{sha}"
+        return self._get(url).json().get('stats', {})
 
-                commits.extend(batch)
-                page += 1
-                sleep(0.5)
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    print(f"Project {project['path_with_namespace']} (ID: {
-                          project['id']}) not found or no access.")
-                else:
-                    print(f"HTTP Error for project {
-                          project['path_with_namespace']}: {str(e)}")
-                break
-            except Exception as e:
-                print(f"Error fetching commits for project {
-                      project['path_with_namespace']}: {str(e)}")
-                break
 
-        return commits
+def _header_int(headers, name: str) -> Optional[int]:
+    """Parse an integer response header, treating blanks as missing."""
+    try:
+        return int(headers.get(name) or '')
+    except ValueError:
+        return None
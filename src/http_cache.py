@@ -0,0 +1,89 @@
+# File: src/http_cache.py
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Headers describing the encoded body are dropped because the cache stores
+# the decoded content.
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class ResponseCache:
+    """On-disk cache of GET responses, revalidated with ETag/Last-Modified."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url: str, params: Optional[Dict[str, Any]]) -> str:
+        key = json.dumps([url, sorted((params or {}).items())], default=str)
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def get(self, url: str,
+            params: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """Return the cached entry for a request, if any."""
+        try:
+            with open(self._path(url, params), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def validators(entry: Dict) -> Dict[str, str]:
+        """Return the conditional request headers for a cached entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url: str, params: Optional[Dict[str, Any]],
+            response: requests.Response):
+        """Store a successful response if the server sent validators."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() not in SKIPPED_HEADERS},
+            'body': response.content.decode('utf-8'),
+        }
+        path = self._path(url, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write atomically so concurrent fetches never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def to_response(entry: Dict,
+                    not_modified: requests.Response) -> requests.Response:
+        """Build a 200 response from a cached entry and a 304 reply."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # Fresh rate limit headers from the 304 take precedence
+        response.headers.update(not_modified.headers)
+        for name in SKIPPED_HEADERS:
+            response.headers.pop(name, None)
+        return response
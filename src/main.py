@@ -1,16 +1,24 @@
 # File: src/main.py
 import os
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import argparse
-from typing import Dict, Any
+import requests
+from typing import Dict, Any, Iterable, List, Optional, Set
+from .commit_stats import CommitStatsFetcher
+from .commit_store import SINCE_SLACK, CommitStore, to_epoch
+from .dedup import CommitDeduplicator, DEDUP_MODES
+from .git_mirror import GitMirror
 from .gitlab_api import GitLabAPI
-from .ai_summarizer import CommitSummarizer
-from .data_processor import ActivityDataProcessor
-from .report_generator import ReportGenerator
+from .metrics import metrics
+from .pipeline import iter_commit_rows, iter_fetched_commits
+from .rollups import refresh_rollups
+from .ai_summarizer import CommitSummarizer, SUMMARY_MODES
+from .summary_cache import SummaryCache
 
 
-def parse_args() -> Dict[str, Any]:
+def parse_args(argv: Optional[List[str]] = None) -> Dict[str, Any]:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
         description='Extract and analyze GitLab repository activity'
@@ -24,8 +32,10 @@ def parse_args() -> Dict[str, Any]:
     )
     parser.add_argument(
         '--group-id',
-        type=int,
-        help='GitLab group ID to analyze',
+        dest='group_ids',
+        type=lambda s: [int(group_id) for group_id in s.split(',')
+                        if group_id.strip()],
+        help='GitLab group ID to analyze; several can be given separated by commas',  # noqa
         default=os.getenv('GITLAB_GROUP_ID')
     )
 
@@ -38,7 +48,7 @@ def parse_args() -> Dict[str, Any]:
     parser.add_argument(
         '--author-email',
         default=os.getenv('GITLAB_AUTHOR_EMAIL', ''),
-        help='Filter commits by author email'
+        help='Filter commits by author email; with several comma-separated emails, reports are written per author'  # noqa
     )
     parser.add_argument(
         '--minutes-per-commit',
@@ -62,6 +72,206 @@ def parse_args() -> Dict[str, Any]:
         default=os.getenv('OPENAI_API_KEY'),
         help='OpenAI API key for commit summarization'
     )
+    parser.add_argument(
+        '--summary-mode',
+        choices=SUMMARY_MODES,
+        default=os.getenv('SUMMARY_MODE', 'assistant'),
+        help='Summarize through an assistant thread/run or a single chat completion call (default: assistant)'  # noqa
+    )
+    parser.add_argument(
+        '--assistant-id',
+        default=os.getenv('OPENAI_ASSISTANT_ID', ''),
+        help='Reuse an existing OpenAI assistant instead of creating one'
+    )
+    parser.add_argument(
+        '--assistant-id-file',
+        default=os.getenv('OPENAI_ASSISTANT_ID_FILE', ''),
+        help='File that keeps the assistant ID so later runs reuse it'
+    )
+    parser.add_argument(
+        '--summary-concurrency',
+        type=int,
+        default=int(os.getenv('SUMMARY_CONCURRENCY', '4')),
+        help='Summaries requested in parallel (default: 4)'
+    )
+    parser.add_argument(
+        '--summary-rpm',
+        type=float,
+        default=float(os.getenv('SUMMARY_RPM', '60')),
+        help='Maximum summary requests started per minute (default: 60)'
+    )
+    parser.add_argument(
+        '--summary-max-tokens',
+        type=int,
+        default=int(os.getenv('SUMMARY_MAX_TOKENS', '8000')),
+        help='Approximate input tokens per summary request; larger days are summarized in chunks and merged (default: 8000)'  # noqa
+    )
+    parser.add_argument(
+        '--summary-cache-dir',
+        default=os.getenv('SUMMARY_CACHE_DIR', ''),
+        help='Directory for caching AI summaries between runs'
+    )
+    parser.add_argument(
+        '--summary-cache-max-mb',
+        type=int,
+        default=int(os.getenv('SUMMARY_CACHE_MAX_MB', '100')),
+        help='Size limit of the summary cache in MB (default: 100)'
+    )
+    parser.add_argument(
+        '--summary-cache-max-age-days',
+        type=float,
+        default=float(os.getenv('SUMMARY_CACHE_MAX_AGE_DAYS', '90')),
+        help='Drop cached summaries unused for this many days (default: 90)'
+    )
+    parser.add_argument(
+        '--prefilter-by-events',
+        action='store_true',
+        default=os.getenv('PREFILTER_BY_EVENTS', '').lower() == 'true',
+        help="With --author-email, only crawl projects the author pushed to according to their contribution events"  # noqa
+    )
+    parser.add_argument(
+        '--commit-source',
+        choices=['api', 'git'],
+        default=os.getenv('COMMIT_SOURCE', 'api'),
+        help='Read commits through the REST API or from local bare git mirrors (default: api)'  # noqa
+    )
+    parser.add_argument(
+        '--mirror-dir',
+        default=os.getenv('MIRROR_DIR', 'gitlab_mirrors'),
+        help='Directory for the bare mirrors used by --commit-source git (default: gitlab_mirrors)'  # noqa
+    )
+    parser.add_argument(
+        '--dedup',
+        choices=DEDUP_MODES,
+        default=os.getenv('DEDUP', 'sha'),
+        help='Count commits seen in several refs, forks or groups once, by SHA or also by patch-id (default: sha)'  # noqa
+    )
+    parser.add_argument(
+        '--dedup-bloom-capacity',
+        type=int,
+        default=int(os.getenv('DEDUP_BLOOM_CAPACITY', '0')),
+        help='Track seen commits in a Bloom filter sized for this many commits instead of an exact set'  # noqa
+    )
+    parser.add_argument(
+        '--lazy-stats',
+        action='store_true',
+        default=os.getenv('LAZY_STATS', '').lower() == 'true',
+        help='List commits without line stats and fetch them with one request per reported commit; on a cold run this is far more API load than the default, and only pays off when large diffs make listings with stats slow'  # noqa
+    )
+    parser.add_argument(
+        '--omit-line-stats',
+        action='store_true',
+        default=os.getenv('OMIT_LINE_STATS', '').lower() == 'true',
+        help='Leave lines added/deleted out of every report, so commits are listed without stats and none are fetched'  # noqa
+    )
+    parser.add_argument(
+        '--stats-concurrency',
+        type=int,
+        default=int(os.getenv('STATS_CONCURRENCY', '8')),
+        help='Single-commit stats requests sent in parallel, for --lazy-stats or stored commits synced without stats (default: 8)'  # noqa
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=int(os.getenv('MAX_CONCURRENCY', '4')),
+        help='Number of projects to fetch commits for in parallel (default: 4)'
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=int(os.getenv('MAX_RETRIES', '5')),
+        help='Retries for rate limited or failed GitLab requests (default: 5)'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=int(os.getenv('POOL_SIZE', '16')),
+        help='Maximum pooled keep-alive connections to GitLab (default: 16)'
+    )
+    parser.add_argument(
+        '--page-concurrency',
+        type=int,
+        default=int(os.getenv('PAGE_CONCURRENCY', '4')),
+        help='Pages of one listing fetched in parallel (default: 4)'
+    )
+    parser.add_argument(
+        '--http-cache-dir',
+        default=os.getenv('HTTP_CACHE_DIR', ''),
+        help='Directory for cached GitLab responses revalidated with ETags'
+    )
+    parser.add_argument(
+        '--output-format',
+        choices=['csv', 'parquet', 'feather'],
+        default=os.getenv('OUTPUT_FORMAT', 'csv'),
+        help='Format of the commit and daily stats data (default: csv)'
+    )
+    parser.add_argument(
+        '--append',
+        action='store_true',
+        default=os.getenv('APPEND', '').lower() == 'true',
+        help='Append to existing Parquet/Feather datasets instead of replacing the partitions of this run'  # noqa
+    )
+    parser.add_argument(
+        '--incremental-reports',
+        action='store_true',
+        default=os.getenv('INCREMENTAL_REPORTS', '').lower() == 'true',
+        help='Only rewrite reports of repositories whose daily stats changed since the last run'  # noqa
+    )
+    parser.add_argument(
+        '--report-workers',
+        type=int,
+        default=int(os.getenv('REPORT_WORKERS', '4')),
+        help='Repositories whose report files are written in parallel (default: 4)'  # noqa
+    )
+    parser.add_argument(
+        '--store',
+        default=os.getenv('COMMIT_STORE', ''),
+        help='SQLite file for incremental sync of commits between runs'
+    )
+    parser.add_argument(
+        '--store-lookback-hours',
+        type=float,
+        default=float(os.getenv('STORE_LOOKBACK_HOURS', '24')),
+        help='Hours before the newest stored commit that --store syncs fetch again; commits dated earlier but pushed after the last sync are missed (default: 24)'  # noqa
+    )
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        default=os.getenv('STREAMING', '').lower() == 'true',
+        help='Aggregate commits page by page to bound memory use'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        default=os.getenv('SERVE', '').lower() == 'true',
+        help='Keep running, updating reports from GitLab push webhooks and periodic polls'  # noqa
+    )
+    parser.add_argument(
+        '--listen',
+        default=os.getenv('LISTEN', '127.0.0.1:8080'),
+        help='Address for the webhook endpoint in --serve mode (default: 127.0.0.1:8080)'  # noqa
+    )
+    parser.add_argument(
+        '--webhook-secret',
+        default=os.getenv('WEBHOOK_SECRET', ''),
+        help='Secret token GitLab sends in X-Gitlab-Token with each webhook'
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=float(os.getenv('POLL_INTERVAL', '300')),
+        help='Seconds between polls for activity in --serve mode; 0 disables polling (default: 300)'  # noqa
+    )
+    parser.add_argument(
+        '--metrics-file',
+        default=os.getenv('METRICS_FILE', ''),
+        help='Write per-phase timings and counters of the run to this JSON file'  # noqa
+    )
+    parser.add_argument(
+        '--prometheus-file',
+        default=os.getenv('PROMETHEUS_FILE', ''),
+        help='Also write the metrics in Prometheus textfile collector format'  # noqa
+    )
     parser.add_argument(
         '--debug',
         action='store_true',
@@ -69,17 +279,133 @@ def parse_args() -> Dict[str, Any]:
         help='Enable debug output'
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Validate required arguments
     if not args.token:
         parser.error(
             "GitLab token is required. Provide via --token or GITLAB_TOKEN environment variable")  # noqa
-    if not args.group_id:
+    if not args.group_ids:
         parser.error(
             "Group ID is required. Provide via --group-id or GITLAB_GROUP_ID environment variable")  # noqa
 
-    return vars(args)
+    if args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
+    if timedelta(hours=args.store_lookback_hours) < SINCE_SLACK:
+        parser.error(
+            f"--store-lookback-hours must be at least {SINCE_SLACK.total_seconds() / 3600:g}")  # noqa
+
+    config = vars(args)
+    config['author_emails'] = [
+        email.strip() for email in args.author_email.split(',')
+        if email.strip()]
+    # A single author is filtered by GitLab; several are fetched together
+    # and split locally
+    config['author_email'] = config['author_emails'][0] \
+        if len(config['author_emails']) == 1 else ''
+    if len(config['author_emails']) > 1 and args.streaming:
+        parser.error("--streaming supports a single --author-email")
+    if args.serve:
+        if len(config['author_emails']) > 1 or args.streaming:
+            parser.error(
+                "--serve supports a single --author-email and no --streaming")  # noqa
+        # Refreshes only re-render the repositories that changed
+        config['incremental_reports'] = True
+    return config
+
+
+def activity_cutoff(start_date: str) -> str:
+    """Return the last-activity time before which projects are skipped.
+
+    GitLab only refreshes `last_activity_at` periodically and commit dates
+    can precede the push, so a day of slack is kept before the start date.
+    """
+    return (datetime.fromisoformat(start_date) - timedelta(days=1)).isoformat()
+
+
+def prune_projects(gitlab: GitLabAPI, projects: List[Dict[str, Any]],
+                   config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Drop projects that cannot have commits matching the filters."""
+    cutoff = to_epoch(activity_cutoff(config['start_date']))
+    active = [project for project in projects
+              if not project.get('last_activity_at')
+              or to_epoch(project['last_activity_at']) >= cutoff]
+
+    if config['prefilter_by_events'] and config['author_emails']:
+        try:
+            pushed = pushed_project_ids(gitlab, config)
+            if pushed is not None:
+                active = [project for project in active
+                          if project['id'] in pushed]
+        except requests.exceptions.RequestException as e:
+            print(f"Error reading contribution events: {str(e)}")
+
+    pruned = len(projects) - len(active)
+    if pruned:
+        print(f"Skipping {pruned} projects without matching activity since {config['start_date'][:10]}")  # noqa
+    metrics.increment('projects_pruned', pruned)
+    return active
+
+
+def pushed_project_ids(gitlab: GitLabAPI,
+                       config: Dict[str, Any]) -> Optional[Set[int]]:
+    """Return the projects any author pushed to, or None if unknown."""
+    pushed: Set[int] = set()
+    for email in config['author_emails']:
+        user = gitlab.find_user_by_email(email)
+        if user is None:
+            print(f"Could not resolve {email} to a single user; not filtering by events")  # noqa
+            return None
+        pushed |= gitlab.get_pushed_project_ids(
+            user['id'], activity_cutoff(config['start_date'])[:10])
+    return pushed
+
+
+def discover_projects(gitlab: GitLabAPI,
+                      config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """List the projects of every group once, dropping inactive ones.
+
+    Projects shared by several groups (through subgroups or overlapping
+    group IDs) are only crawled once.
+    """
+    projects: Dict[int, Dict[str, Any]] = {}
+    for group_id in dict.fromkeys(config['group_ids']):
+        group_info = gitlab.get_group_info(group_id)
+        print(f"\nAccessing group: {group_info['full_name']}")
+
+        group_projects = gitlab.get_group_projects(
+            group_id, activity_cutoff(config['start_date']))
+        print(f"Found {len(group_projects)} projects in group {group_id}")
+        for project in group_projects:
+            projects.setdefault(project['id'], project)
+
+    return prune_projects(gitlab, list(projects.values()), config)
+
+
+def split_by_author(rows: Iterable[Dict[str, Any]],
+                    buffers: Dict[str, Any]):
+    """Append rows to the buffer of their author.
+
+    `buffers` is keyed by lowercased email, so each row costs one hash
+    lookup however many authors are tracked. Rows of other authors are
+    dropped.
+    """
+    for row in rows:
+        buffer = buffers.get(row['author_email'].lower())
+        if buffer is not None:
+            buffer.append(row)
+
+
+def write_metrics(config: Dict[str, Any]):
+    """Emit the run's metrics to the configured files."""
+    try:
+        if config['metrics_file']:
+            metrics.write_json(config['metrics_file'])
+            print(f"Metrics written to {config['metrics_file']}")
+        if config['prometheus_file']:
+            metrics.write_prometheus(config['prometheus_file'])
+    except OSError as e:
+        print(f"Error writing metrics: {str(e)}")
 
 
 def main():
@@ -90,82 +416,202 @@ def main():
     gitlab = GitLabAPI(
         private_token=config['token'],
         gitlab_url=config['gitlab_url'],
-        debug=config['debug']
+        debug=config['debug'],
+        max_retries=config['max_retries'],
+        pool_size=config['pool_size'],
+        cache_dir=config['http_cache_dir'],
+        page_concurrency=config['page_concurrency'],
+        commit_stats=not (config['lazy_stats'] or config['omit_line_stats'])
     )
 
-    summarizer = CommitSummarizer(
-        config['openai_key']) if config['openai_key'] else None
-    processor = ActivityDataProcessor(summarizer)
-    reporter = ReportGenerator(config['output_prefix'])
+    summarizer = None
+    store = None
+    started = time.perf_counter()
 
     try:
-        if not gitlab.test_authentication():
+        with metrics.phase('authenticate'):
+            authenticated = gitlab.test_authentication()
+        if not authenticated:
             print("\nPlease ensure your token has the following scopes:")
             print("- api")
             print("- read_repository")
             print("- read_user")
             sys.exit(1)
 
+        # pandas is only imported once the token is known to work
+        from .commit_buffer import CommitBuffer
+        from .data_processor import ActivityDataProcessor
+        from .report_generator import ReportGenerator
+
+        summarizer = CommitSummarizer(
+            config['openai_key'],
+            mode=config['summary_mode'],
+            max_workers=config['summary_concurrency'],
+            requests_per_minute=config['summary_rpm'],
+            assistant_id=config['assistant_id'],
+            assistant_id_file=config['assistant_id_file'],
+            max_input_tokens=config['summary_max_tokens']
+        ) if config['openai_key'] else None
+        summary_cache = SummaryCache(
+            config['summary_cache_dir'],
+            max_bytes=config['summary_cache_max_mb'] * 1024 * 1024,
+            max_age_days=config['summary_cache_max_age_days']
+        ) if config['summary_cache_dir'] else None
+        store = CommitStore(
+            config['store'],
+            timedelta(hours=config['store_lookback_hours'])
+        ) if config['store'] else None
+        # Fills stats only where rows lack them and reports show them
+        stats_fetcher = CommitStatsFetcher(
+            gitlab, store, max_workers=config['stats_concurrency']
+        ) if not config['omit_line_stats'] else None
+        processor = ActivityDataProcessor(
+            summarizer, summary_cache, stats_fetcher)
+
+        def make_reporter(output_dir: str = "") -> ReportGenerator:
+            return ReportGenerator(
+                config['output_prefix'],
+                max_workers=config['report_workers'],
+                output_format=config['output_format'],
+                append=config['append'],
+                incremental=config['incremental_reports'],
+                output_dir=output_dir,
+                line_stats=not config['omit_line_stats']
+            )
+
+        if len(config['author_emails']) > 1:
+            # One report tree per author
+            reporters = {
+                email.lower(): make_reporter(os.path.join(
+                    f"{config['output_prefix']}_by_author",
+                    email.lower().replace('/', '_')))
+                for email in config['author_emails']}
+        else:
+            reporter = make_reporter()
+        source = GitMirror(
+            config['mirror_dir'],
+            private_token=config['token'],
+            debug=config['debug'],
+            patch_ids=config['dedup'] == 'patch-id'
+        ) if config['commit_source'] == 'git' else gitlab
+        dedup = CommitDeduplicator(
+            config['dedup'],
+            bloom_capacity=config['dedup_bloom_capacity']
+        ) if config['dedup'] != 'off' else None
+
         # Fetch and process data
-        group_info = gitlab.get_group_info(config['group_id'])
-        print(f"\nAccessing group: {group_info['full_name']}")
+        with metrics.phase('discover_projects'):
+            projects = discover_projects(gitlab, config)
+        metrics.increment('projects', len(projects))
 
-        projects = gitlab.get_group_projects(config['group_id'])
-        print(f"Found {len(projects)} projects in group {config['group_id']}")
+        if config['serve']:
+            from .service import ActivityService
+            ActivityService(gitlab, source, processor, reporter,
+                            config, store, dedup).run(projects)
+            return
 
         if not projects:
-            print("No projects found. Please check group ID and permissions.")
-            sys.exit(1)
+            print("\nNo commits found matching the criteria")
+            return
+
+        if config['streaming']:
+            rows = iter_commit_rows(source, projects, config, store)
+            if dedup:
+                rows = dedup.filter(rows)
+            if stats_fetcher:
+                rows = stats_fetcher.iter_with_stats(rows)
+            # Fetching and aggregating interleave page by page
+            with metrics.phase('fetch_and_process'):
+                commits_df, repo_stats = processor.process_commit_stream(
+                    reporter.write_detailed_stream(rows),
+                    config['minutes_per_commit']
+                )
+            if dedup and dedup.duplicates:
+                print(f"Skipped {dedup.duplicates} duplicate commits")
+            if store:
+                with metrics.phase('rollups'):
+                    refresh_rollups(store, projects, config, dedup)
+            if not repo_stats:
+                print("\nNo commits found matching the criteria")
+                return
+            with metrics.phase('generate_reports'):
+                reporter.generate_reports(commits_df, repo_stats)
+            return
 
         # Collect commits
-        all_commits = []
+        all_commits = CommitBuffer()
+        author_commits = {email: CommitBuffer() for email in reporters} \
+            if len(config['author_emails']) > 1 else None
         successful_projects = 0
 
-        for project in projects:
-            try:
-                commits = gitlab.get_project_commits(
-                    project,
-                    config['start_date'],
-                    config['author_email']
-                )
-                if commits:
-                    print(f"Found {len(commits)} commits in {project['path_with_namespace']}")  # noqa
-                    successful_projects += 1
-                    for commit in commits:
-                        all_commits.append({
-                            'timestamp': commit['created_at'],
-                            'project': project['path_with_namespace'],
-                            'commit_id': commit['id'],
-                            'message': commit['message'],
-                            'additions': commit.get('stats', {}).get('additions', 0),  # noqa
-                            'deletions': commit.get('stats', {}).get('deletions', 0),  # noqa
-                            'total_changes': commit.get('stats', {}).get('total', 0),  # noqa
-                            'author_name': commit['author_name'],
-                            'author_email': commit['author_email']
-                        })
-            except Exception as e:
-                print(f"Error processing project {
-                      project['path_with_namespace']}: {str(e)}")
+        # Each project's rows move into the columnar buffers as soon as
+        # its fetch completes, so their dicts are released project by
+        # project
+        with metrics.phase('fetch_commits'):
+            fetched = iter_fetched_commits(source, projects, config, store)
+            for project, rows in fetched:
+                if not rows:
+                    continue
+                print(f"Found {len(rows)} commits in {project['path_with_namespace']}")  # noqa
+                successful_projects += 1
+                if dedup:
+                    # Project order decides which copy is kept
+                    rows = dedup.filter(rows)
+                if author_commits is None:
+                    all_commits.extend(rows)
+                else:
+                    split_by_author(rows, author_commits)
 
         print(f"\nSuccessfully accessed {successful_projects} out of {len(projects)} projects")  # noqa
+        if dedup and dedup.duplicates:
+            print(f"Skipped {dedup.duplicates} duplicate commits")
+
+        if author_commits is not None:
+            for email, commits in author_commits.items():
+                if not commits:
+                    print(f"\nNo commits found for {email}")
+                    continue
+                print(f"\nWriting reports for {email}")
+                with metrics.phase('process_commits'):
+                    commits_df, repo_stats = processor.process_commits(
+                        commits,
+                        config['minutes_per_commit']
+                    )
+                with metrics.phase('generate_reports'):
+                    reporters[email].generate_reports(commits_df, repo_stats)
+            if store:
+                with metrics.phase('rollups'):
+                    refresh_rollups(store, projects, config, dedup)
+            return
 
         if not all_commits:
             print("\nNo commits found matching the criteria")
             return
 
         # Process commits and generate reports
-        commits_df, repo_stats = processor.process_commits(
-            all_commits,
-            config['minutes_per_commit']
-        )
-        reporter.generate_reports(commits_df, repo_stats)
+        with metrics.phase('process_commits'):
+            commits_df, repo_stats = processor.process_commits(
+                all_commits,
+                config['minutes_per_commit']
+            )
+        with metrics.phase('generate_reports'):
+            reporter.generate_reports(commits_df, repo_stats)
+        # After processing, so stats fetched on demand are stored too
+        if store:
+            with metrics.phase('rollups'):
+                refresh_rollups(store, projects, config, dedup)
 
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
     finally:
+        gitlab.close()
+        if store:
+            store.close()
         if summarizer:
             summarizer.cleanup()
+        metrics.add_phase('total', time.perf_counter() - started)
+        write_metrics(config)
 
 
 if __name__ == '__main__':
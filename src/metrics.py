@@ -0,0 +1,144 @@
+# File: src/metrics.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+PROMETHEUS_PREFIX = 'gitlab_activity'
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': {str(bound): count
+                        for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class Metrics:
+    """Thread-safe registry of run counters, histograms and phase timers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear every recorded value."""
+        with self._lock:
+            self.counters: Dict[str, float] = {}
+            self.histograms: Dict[str, Histogram] = {}
+            self.phases: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Add to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float,
+                buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Record a value in a histogram, creating it on first use."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the run; repeated phases accumulate."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        """Add time spent in a phase measured elsewhere."""
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as plain data."""
+        with self._lock:
+            counters = dict(self.counters)
+            data = {
+                'phases_seconds': dict(self.phases),
+                'counters': counters,
+                'histograms': {name: histogram.to_dict()
+                               for name, histogram in self.histograms.items()},
+            }
+        hits = counters.get('summary_cache_hits', 0)
+        lookups = hits + counters.get('summary_cache_misses', 0)
+        data['summary_cache_hit_rate'] = hits / lookups if lookups else None
+        return data
+
+    def write_json(self, path: str):
+        """Write a JSON snapshot of the run."""
+        _atomic_write(path, json.dumps(self.snapshot(), indent=2))
+
+    def write_prometheus(self, path: str):
+        """Write the metrics in the node_exporter textfile format."""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        metric = f"{PROMETHEUS_PREFIX}_phase_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        for phase, seconds in sorted(snapshot['phases_seconds'].items()):
+            lines.append(f'{metric}{{phase="{phase}"}} {seconds}')
+
+        for name, histogram in sorted(snapshot['histograms'].items()):
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in histogram['buckets'].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{metric}_sum {histogram['sum']}")
+            lines.append(f"{metric}_count {histogram['count']}")
+
+        if snapshot['summary_cache_hit_rate'] is not None:
+            metric = f"{PROMETHEUS_PREFIX}_summary_cache_hit_ratio"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {snapshot['summary_cache_hit_rate']}")
+
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def _atomic_write(path: str, content: str):
+    # Scrapers must never read a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Process-wide registry shared by all components of a run
+metrics = Metrics()
@@ -0,0 +1,170 @@
+# File: src/pipeline.py
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+from .commit_store import CommitStore, newest_timestamp
+from .dedup import commit_fingerprint
+from .git_mirror import GitMirror
+from .gitlab_api import GitLabAPI
+
+# Anything with GitLabAPI's get/iter_project_commits interface
+CommitSource = Union[GitLabAPI, GitMirror]
+
+
+def commit_to_row(project: Dict[str, Any],
+                  commit: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a GitLab commit into the row format used for processing."""
+    stats = commit.get('stats')
+    return {
+        'timestamp': commit['created_at'],
+        'project': project['path_with_namespace'],
+        'commit_id': commit['id'],
+        'message': commit['message'],
+        # Listings without stats leave them to be fetched later
+        'additions': stats.get('additions', 0) if stats else None,
+        'deletions': stats.get('deletions', 0) if stats else None,
+        'total_changes': stats.get('total', 0) if stats else None,
+        'author_name': commit['author_name'],
+        'author_email': commit['author_email'],
+        'patch_id': commit.get('patch_id') or commit_fingerprint(commit)
+    }
+
+
+def fetch_project_commits(
+        gitlab: CommitSource, project: Dict[str, Any],
+        config: Dict[str, Any],
+        store: Optional[CommitStore] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """Fetch commit rows for one project, returning None if it failed.
+
+    With a commit store, only commits after the project's high-water mark
+    are requested, and projects whose last activity has not changed since
+    a sync that ran well after it are served entirely from the store.
+    """
+    try:
+        since = config['start_date']
+        if store:
+            since = store.fetch_since(
+                project, config['start_date'], config['author_email'])
+            if since is None:
+                gitlab.debug_print(f"{project['path_with_namespace']} unchanged since last sync")  # noqa
+                return store.load_commits(
+                    project, config['start_date'], config['author_email'])
+
+        commits = gitlab.get_project_commits(
+            project,
+            since,
+            config['author_email']
+        )
+        rows = [commit_to_row(project, commit) for commit in commits]
+
+        if store:
+            store.save_commits(
+                project, rows, config['start_date'], config['author_email'])
+            return store.load_commits(
+                project, config['start_date'], config['author_email'])
+        return rows
+    except Exception as e:
+        print(f"Error processing project {
+              project['path_with_namespace']}: {str(e)}")
+        return None
+
+
+def iter_project_rows(
+        gitlab: CommitSource, project: Dict[str, Any],
+        config: Dict[str, Any],
+        store: Optional[CommitStore] = None) -> Iterator[Dict[str, Any]]:
+    """Stream commit rows for one project page by page."""
+    since = config['start_date']
+    if store:
+        since = store.fetch_since(
+            project, config['start_date'], config['author_email'])
+        if since is None:
+            gitlab.debug_print(f"{project['path_with_namespace']} unchanged since last sync")  # noqa
+            yield from store.iter_commits(
+                project, config['start_date'], config['author_email'])
+            return
+
+    newest = None
+    for page in gitlab.iter_project_commits(
+            project, since, config['author_email']):
+        rows = [commit_to_row(project, commit) for commit in page]
+        if store:
+            store.add_commits(project, rows)
+            newest = newest_timestamp(rows, newest)
+        else:
+            yield from rows
+
+    if store:
+        store.mark_synced(project, config['start_date'],
+                          config['author_email'], newest)
+        yield from store.iter_commits(
+            project, config['start_date'], config['author_email'])
+
+
+def iter_commit_rows(
+        gitlab: CommitSource, projects: List[Dict[str, Any]],
+        config: Dict[str, Any],
+        store: Optional[CommitStore] = None) -> Iterator[Dict[str, Any]]:
+    """Stream commit rows for all projects in project order."""
+    successful_projects = 0
+    for project in projects:
+        count = 0
+        try:
+            for row in iter_project_rows(gitlab, project, config, store):
+                count += 1
+                yield row
+        except Exception as e:
+            print(f"Error processing project {
+                  project['path_with_namespace']}: {str(e)}")
+        if count:
+            print(f"Found {count} commits in {project['path_with_namespace']}")  # noqa
+            successful_projects += 1
+
+    print(f"\nSuccessfully accessed {successful_projects} out of {len(projects)} projects")  # noqa
+
+
+def iter_fetched_commits(
+        gitlab: CommitSource, projects: List[Dict[str, Any]],
+        config: Dict[str, Any],
+        store: Optional[CommitStore] = None
+) -> Iterator[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]]:
+    """Yield (project, rows) in project order as the fetches complete.
+
+    At most twice `max_concurrency` projects are fetched ahead of the
+    consumer, so only their rows are held as dicts at any one time.
+    """
+    workers = min(config['max_concurrency'], len(projects))
+    if workers <= 1:
+        for project in projects:
+            yield project, fetch_project_commits(
+                gitlab, project, config, store)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Tuple[Dict[str, Any], Future]] = deque()
+        project_iter = iter(projects)
+
+        def submit() -> bool:
+            for project in project_iter:
+                pending.append((project, executor.submit(
+                    fetch_project_commits, gitlab, project, config, store)))
+                return True
+            return False
+
+        while len(pending) < workers * 2 and submit():
+            pass
+        while pending:
+            project, future = pending.popleft()
+            submit()
+            yield project, future.result()
+
+
+def fetch_all_commits(
+        gitlab: CommitSource, projects: List[Dict[str, Any]],
+        config: Dict[str, Any],
+        store: Optional[CommitStore] = None
+) -> List[Optional[List[Dict[str, Any]]]]:
+    """Fetch commit rows for all projects, preserving the project order."""
+    return [rows for _, rows in iter_fetched_commits(
+        gitlab, projects, config, store)]
@@ -0,0 +1,113 @@
+# File: src/query.py
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from .rollups import GROUP_BY_FIELDS, MEASURES, RollupIndex
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Query activity rollups kept in a commit store'
+    )
+    parser.add_argument(
+        '--store',
+        default=os.getenv('COMMIT_STORE', ''),
+        help='SQLite commit store written by gitlab-activity --store'
+    )
+    parser.add_argument(
+        '--start',
+        default=(date.today() - timedelta(days=6)).isoformat(),
+        help='First day of the range, YYYY-MM-DD (default: 7 days ago)'
+    )
+    parser.add_argument(
+        '--end',
+        default=date.today().isoformat(),
+        help='Last day of the range, YYYY-MM-DD (default: today)'
+    )
+    parser.add_argument(
+        '--group-by',
+        default='project',
+        help=f"Comma-separated fields to group by: {', '.join(GROUP_BY_FIELDS)} (default: project)"  # noqa
+    )
+    parser.add_argument(
+        '--project',
+        action='append',
+        default=[],
+        help='Only include this project path (repeatable)'
+    )
+    parser.add_argument(
+        '--author',
+        action='append',
+        default=[],
+        help='Only include this author email (repeatable)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['table', 'csv', 'json'],
+        default='table',
+        help='Output format (default: table)'
+    )
+
+    args = parser.parse_args(argv)
+    if not args.store:
+        parser.error(
+            "A commit store is required. Provide via --store or COMMIT_STORE environment variable")  # noqa
+    if not os.path.exists(args.store):
+        parser.error(f"Commit store not found: {args.store}")
+
+    config = vars(args)
+    config['group_by'] = [field.strip() for field in args.group_by.split(',')
+                          if field.strip()]
+    return config
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]):
+    """Print rows as an aligned plain-text table."""
+    cells = [columns] + [[str(row[column]) for column in columns]
+                         for row in rows]
+    widths = [max(len(line[index]) for line in cells)
+              for index in range(len(columns))]
+    # Group columns are left aligned, the measures right aligned
+    groups = len(columns) - len(MEASURES)
+    for number, line in enumerate(cells):
+        print("  ".join(
+            cell.ljust(width) if index < groups else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(line, widths))))
+        if number == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def main(argv: Optional[List[str]] = None):
+    config = parse_args(argv)
+    index = RollupIndex(config['store'])
+    try:
+        rows = index.query(config['start'], config['end'],
+                           group_by=config['group_by'],
+                           projects=config['project'],
+                           authors=config['author'])
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    finally:
+        index.close()
+
+    columns = config['group_by'] + list(MEASURES)
+    if config['format'] == 'json':
+        print(json.dumps(rows, indent=2))
+    elif config['format'] == 'csv':
+        writer = csv.DictWriter(sys.stdout, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    elif rows:
+        print_table(rows, columns)
+    else:
+        print("No activity in this range")
+
+
+if __name__ == '__main__':
+    main()
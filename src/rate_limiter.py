@@ -0,0 +1,103 @@
+# File: src/rate_limiter.py
+import random
+import threading
+import time
+from typing import Mapping, Optional
+
+
+class RateLimiter:
+    """Shared, thread-safe controller for GitLab's rate limit headers.
+
+    Requests are never delayed unless the server asks for it, either with a
+    ``Retry-After`` header or by reporting that the remaining quota in
+    ``RateLimit-Remaining`` is exhausted until ``RateLimit-Reset``.
+    """
+
+    def __init__(self, min_remaining: int = 1, backoff_base: float = 0.5,
+                 backoff_cap: float = 60.0, debug: bool = False):
+        self.min_remaining = min_remaining
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.debug = debug
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def debug_print(self, message: str):
+        """Print debug messages if debug mode is enabled."""
+        if self.debug:
+            print(f"DEBUG: {message}")
+
+    def wait(self) -> float:
+        """Block until requests may be sent again, returning the wait time."""
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay <= 0:
+            return 0.0
+        self.debug_print(f"Rate limited, waiting {delay:.2f}s")
+        time.sleep(delay)
+        return delay
+
+    def pause(self, seconds: float):
+        """Hold back all requests for at least the given number of seconds."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._resume_at = max(
+                self._resume_at, time.monotonic() + seconds)
+
+    def update(self, headers: Mapping[str, str]):
+        """Record the rate limit state reported by a response."""
+        retry_after = self.retry_after(headers)
+        if retry_after is not None:
+            self.pause(retry_after)
+            return
+
+        remaining = _to_int(headers.get('RateLimit-Remaining'))
+        reset = _to_int(headers.get('RateLimit-Reset'))
+        if remaining is not None and reset is not None \
+                and remaining <= self.min_remaining:
+            self.pause(reset - time.time())
+
+    def backoff(self, attempt: int) -> float:
+        """Return a fully jittered exponential backoff delay."""
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+        """Return the server-requested delay in seconds, if any."""
+        value = headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+
+class RequestBudget:
+    """Thread-safe budget that spaces request starts to a per-minute rate."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute \
+            if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> float:
+        """Block until the next request may start, returning the wait."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
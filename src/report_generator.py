@@ -1,152 +1,383 @@
 # File: src/report_generator.py
+import csv
+import hashlib
+import json
 import os
 import pandas as pd
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+from .ai_summarizer import SUMMARY_ERROR, SUMMARY_UNAVAILABLE
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather')
+
+DETAILED_COLUMNS = [
+    'timestamp', 'project', 'commit_id', 'message', 'additions',
+    'deletions', 'total_changes', 'author_name', 'author_email'
+]
+LINE_STAT_COLUMNS = ['additions', 'deletions', 'total_changes']
+
+
+def _stats_hash(daily_stats: pd.DataFrame) -> str:
+    """Return a content hash of a repository's daily stats.
+
+    Summary text is left out since model output differs between runs;
+    only whether each day has a real summary counts, so days retried
+    after a failed or unavailable summary are rendered again.
+    """
+    hashable = daily_stats.astype({'commit_messages': str}).drop(
+        columns='commit_summary')
+    hashable['summarized'] = ~daily_stats['commit_summary'].isin(
+        [SUMMARY_ERROR, SUMMARY_UNAVAILABLE])
+    row_hashes = pd.util.hash_pandas_object(hashable, index=False)
+    digest = hashlib.sha256(row_hashes.to_numpy().tobytes())
+    digest.update(','.join(hashable.columns).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _repo_totals(daily_stats: pd.DataFrame) -> Dict[str, Any]:
+    """Return the per-repository figures used by the overall summary."""
+    max_commits_day = daily_stats.loc[daily_stats['commits'].idxmax()]
+    return {
+        'commits': int(daily_stats['commits'].sum()),
+        'activity_minutes': int(daily_stats['activity_minutes'].sum()),
+        'active_days': len(daily_stats),
+        'additions': int(daily_stats['additions'].sum()),
+        'deletions': int(daily_stats['deletions'].sum()),
+        'avg_commits_per_day': float(daily_stats['commits'].mean()),
+        'most_active_day': str(max_commits_day.name),
+        'most_active_day_commits': int(max_commits_day['commits']),
+    }
 
 
 class ReportGenerator:
-    def __init__(self, output_prefix: str):
-        self.output_dir = f"{output_prefix}_by_repo"
+    def __init__(self, output_prefix: str, max_workers: int = 4,
+                 output_format: str = 'csv', append: bool = False,
+                 incremental: bool = False, output_dir: str = "",
+                 line_stats: bool = True):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        if output_format != 'csv':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    f"The {output_format} output format requires pyarrow. "
+                    "Install it with: pip install pyarrow")
+        self.output_dir = output_dir or f"{output_prefix}_by_repo"
+        self.max_workers = max_workers
+        self.output_format = output_format
+        self.append = append
+        self.incremental = incremental
+        # Without line stats, reports only carry counts, time and messages
+        self.line_stats = line_stats
         os.makedirs(self.output_dir, exist_ok=True)
 
     def generate_reports(self, commits_df: pd.DataFrame, repo_stats: Dict[str, pd.DataFrame]):  # noqa
-        """Generate all report files."""
-        self._export_detailed_data(commits_df)
-        self._export_daily_summaries(repo_stats)
-        self._create_overall_summary(repo_stats)
-
-    def _export_detailed_data(self, commits_df: pd.DataFrame):
-        """Export detailed commit data by repository."""
-        for repo_name, repo_commits in commits_df.groupby('project'):
-            safe_repo_name = str(repo_name).replace('/', '_')
-            repo_commits.to_csv(
-                f"{self.output_dir}/{safe_repo_name}_detailed.csv",
-                index=False
-            )
+        """Generate all report files.
 
-    def _export_daily_summaries(self, repo_stats: Dict[str, pd.DataFrame]):
-        """Export daily summaries and reports for each repository."""
+        Commits are split by repository in a single grouping pass, and the
+        files of each repository are then rendered on a worker pool. With
+        a columnar output format the commit table and daily stats are
+        written as datasets instead of per-repository CSV files. In
+        incremental mode only repositories whose daily stats changed since
+        the last run are rendered again.
+        """
+        manifest = self._load_manifest() if self.incremental else {}
+        repo_totals: Dict[str, Dict[str, Any]] = {}
+        changed = []
         for repo_name, daily_stats in repo_stats.items():
-            safe_repo_name = repo_name.replace('/', '_')
+            entry = manifest.get(repo_name)
+            digest = _stats_hash(daily_stats) if self.incremental else None
+            if entry and entry['hash'] == digest and \
+                    self._outputs_exist(repo_name):
+                repo_totals[repo_name] = entry['totals']
+                continue
+            changed.append(repo_name)
+            repo_totals[repo_name] = _repo_totals(daily_stats)
+            manifest[repo_name] = {
+                'hash': digest, 'totals': repo_totals[repo_name]}
+
+        if self.incremental:
+            print(f"Rendering {len(changed)} of {len(repo_stats)} repositories with changed activity")  # noqa
+        if len(changed) < len(repo_stats):
+            repo_stats = {name: repo_stats[name] for name in changed}
+            if not commits_df.empty:
+                commits_df = commits_df[commits_df['project'].isin(changed)]
+
+        if self.output_format == 'csv':
+            repo_commits = {} if commits_df.empty else dict(
+                iter(commits_df.groupby('project', observed=True)))
+        else:
+            self._write_datasets(commits_df, repo_stats)
+            repo_commits = {}
+        repo_names = list(dict.fromkeys([*repo_commits, *repo_stats]))
 
-            # Export CSV summary
-            daily_stats.to_csv(
-                f"{self.output_dir}/{safe_repo_name}_daily_summary.csv",
+        def render(repo_name: str):
+            self._render_repo(repo_name, repo_commits.get(repo_name),
+                              repo_stats.get(repo_name))
+
+        if self.max_workers <= 1 or len(repo_names) <= 1:
+            for repo_name in repo_names:
+                render(repo_name)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # list() surfaces the first rendering error, if any
+                list(executor.map(render, repo_names))
+
+        self._create_overall_summary(repo_totals)
+        if self.incremental:
+            self._save_manifest(manifest)
+
+    def _manifest_path(self) -> str:
+        return f"{self.output_dir}/manifest.json"
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load per-repo hashes and totals, if written in this format."""
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('output_format') != self.output_format:
+            return {}
+        return manifest.get('repos', {})
+
+    def _save_manifest(self, repos: Dict[str, Any]):
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'output_format': self.output_format, 'repos': repos},
+                      f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _outputs_exist(self, repo_name: str) -> bool:
+        """Check that a repository's rendered files are still on disk."""
+        safe_repo_name = repo_name.replace('/', '_')
+        paths = [f"{self.output_dir}/{safe_repo_name}_daily_report.md"]
+        if self.output_format == 'csv':
+            paths.append(
+                f"{self.output_dir}/{safe_repo_name}_daily_summary.csv")
+        return all(os.path.exists(path) for path in paths)
+
+    def _render_repo(self, repo_name: str,
+                     repo_commits: Optional[pd.DataFrame],
+                     daily_stats: Optional[pd.DataFrame]):
+        """Write the detailed, summary and report files of one repository."""
+        safe_repo_name = str(repo_name).replace('/', '_')
+        if repo_commits is not None:
+            self._visible(repo_commits).to_csv(
+                f"{self.output_dir}/{safe_repo_name}_detailed.csv",
                 index=False
             )
-
-            # Create readable report
+        if daily_stats is not None:
+            if self.output_format == 'csv':
+                self._visible(daily_stats).to_csv(
+                    f"{self.output_dir}/{safe_repo_name}_daily_summary.csv",
+                    index=False
+                )
             self._create_daily_report(repo_name, daily_stats)
 
+    def _visible(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Drop the line stat columns when they are not reported."""
+        if self.line_stats:
+            return df
+        return df.drop(columns=LINE_STAT_COLUMNS, errors='ignore')
+
+    def _write_datasets(self, commits_df: pd.DataFrame,
+                        repo_stats: Dict[str, pd.DataFrame]):
+        """Write commits and daily stats as datasets partitioned by
+        project and month.
+
+        By default the partitions touched by this run are replaced, so
+        reruns are idempotent. With `append`, new files are added next to
+        the existing ones, which suits runs over non-overlapping ranges.
+        """
+        if not commits_df.empty:
+            commits = commits_df.assign(
+                month=commits_df['timestamp'].dt.strftime('%Y-%m'))
+            self._write_dataset(commits, 'commits')
+
+        if repo_stats:
+            daily = pd.concat(
+                [stats.assign(project=repo_name)
+                 for repo_name, stats in repo_stats.items()],
+                ignore_index=True)
+            daily['month'] = pd.to_datetime(daily['date']).dt.strftime('%Y-%m')
+            self._write_dataset(daily, 'daily_stats')
+
+    def _write_dataset(self, df: pd.DataFrame, name: str):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        extension = 'parquet' if self.output_format == 'parquet' else 'arrow'
+        ds.write_dataset(
+            pa.Table.from_pandas(self._visible(df), preserve_index=False),
+            f"{self.output_dir}/{name}",
+            format=self.output_format,
+            partitioning=['project', 'month'],
+            partitioning_flavor='hive',
+            basename_template=f"part-{run_id}-{{i}}.{extension}",
+            existing_data_behavior='overwrite_or_ignore'
+            if self.append else 'delete_matching'
+        )
+
+    def write_detailed_stream(
+            self, commits: Iterable[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Pass commits through while appending them to the detailed CSVs.
+
+        Used by the streaming pipeline, where no detailed DataFrame exists.
+        Rows are written in arrival order with the raw commit columns, as
+        CSV whatever the output format.
+        """
+        columns = DETAILED_COLUMNS if self.line_stats else [
+            column for column in DETAILED_COLUMNS
+            if column not in LINE_STAT_COLUMNS]
+        seen = set()
+        current_project = None
+        handle = writer = None
+        try:
+            for commit in commits:
+                if commit['project'] != current_project:
+                    if handle:
+                        handle.close()
+                    current_project = commit['project']
+                    safe_repo_name = str(current_project).replace('/', '_')
+                    mode = 'a' if current_project in seen else 'w'
+                    handle = open(
+                        f"{self.output_dir}/{safe_repo_name}_detailed.csv",
+                        mode, newline='')
+                    writer = csv.DictWriter(
+                        handle, columns, extrasaction='ignore')
+                    if mode == 'w':
+                        writer.writeheader()
+                    seen.add(current_project)
+                writer.writerow(commit)
+                yield commit
+        finally:
+            if handle:
+                handle.close()
+
     def _create_daily_report(self, repo_name: str, daily_stats: pd.DataFrame):
         """Create a readable daily report for a repository in Markdown format."""   # noqa
         safe_repo_name = repo_name.replace('/', '_')
-        with open(f"{self.output_dir}/{safe_repo_name}_daily_report.md", 'w') as f:  # noqa
+        total_commits = daily_stats['commits'].sum()
+        total_minutes = daily_stats['activity_minutes'].sum()
+        total_days = len(daily_stats)
+        total_additions = daily_stats['additions'].sum()
+        total_deletions = daily_stats['deletions'].sum()
+
+        parts: List[str] = [
             # Header
-            f.write(f"# Activity Report for {repo_name}\n\n")
-            f.write(
-                f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")  # noqa
+            f"# Activity Report for {repo_name}\n\n",
+            f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n",  # noqa
 
             # Repository Summary
-            f.write("## Repository Summary\n\n")
-            total_commits = daily_stats['commits'].sum()
-            total_minutes = daily_stats['activity_minutes'].sum()
-            total_days = len(daily_stats)
-            total_additions = daily_stats['additions'].sum()
-            total_deletions = daily_stats['deletions'].sum()
-
-            f.write("| Metric | Value |\n")
-            f.write("|--------|-------|\n")
-            f.write(f"| Total Commits | {total_commits:,} |\n")
-            f.write(f"| Total Activity Time | {total_minutes:,} minutes |\n")
-            f.write(f"| Active Days | {total_days:,} |\n")
-            f.write(f"| Lines Added | {total_additions:,} |\n")
-            f.write(f"| Lines Deleted | {total_deletions:,} |\n\n")
+            "## Repository Summary\n\n",
+            "| Metric | Value |\n",
+            "|--------|-------|\n",
+            f"| Total Commits | {total_commits:,} |\n",
+            f"| Total Activity Time | {total_minutes:,} minutes |\n",
+            f"| Active Days | {total_days:,} |\n",
+            f"| Lines Added | {total_additions:,} |\n"
+            f"| Lines Deleted | {total_deletions:,} |\n" if self.line_stats
+            else "",
+            "\n",
 
             # Daily Activity
-            f.write("## Daily Activity\n\n")
-
-            for _, row in daily_stats.iterrows():
-                # Date header
-                f.write(f"### {row['date']}\n\n")
+            "## Daily Activity\n\n",
+        ]
 
-                # Stats table
-                f.write("| Metric | Value |\n")
-                f.write("|--------|-------|\n")
-                f.write(f"| Commits | {row['commits']:,} |\n")
-                f.write(f"| Lines Added | +{row['additions']:,} |\n")
-                f.write(f"| Lines Deleted | -{row['deletions']:,} |\n")
-                f.write(f"| Activity Time | {
-                        row['activity_minutes']} minutes |\n\n")
-
-                # AI Summary
-                f.write("#### Changes Summary\n\n")
-                f.write(f"{row['commit_summary']}\n\n")
+        # Build every day's section from whole columns at once
+        parts.extend(
+            f"### {date}\n\n"
+            "| Metric | Value |\n"
+            "|--------|-------|\n"
+            f"| Commits | {commits:,} |\n"
+            + (f"| Lines Added | +{additions:,} |\n"
+               f"| Lines Deleted | -{deletions:,} |\n"
+               if self.line_stats else "")
+            + f"| Activity Time | {minutes} minutes |\n\n"
+            "#### Changes Summary\n\n"
+            f"{summary}\n\n"
+            "---\n\n"
+            for date, commits, additions, deletions, minutes, summary in zip(
+                daily_stats['date'].tolist(),
+                daily_stats['commits'].tolist(),
+                daily_stats['additions'].tolist(),
+                daily_stats['deletions'].tolist(),
+                daily_stats['activity_minutes'].tolist(),
+                daily_stats['commit_summary'].tolist()
+            )
+        )
 
-                # Separator for readability
-                f.write("---\n\n")
+        with open(f"{self.output_dir}/{safe_repo_name}_daily_report.md", 'w') as f:  # noqa
+            f.write("".join(parts))
 
-    def _create_overall_summary(self, repo_stats: Dict[str, pd.DataFrame]):
+    def _create_overall_summary(self, repo_totals: Dict[str, Dict[str, Any]]):  # noqa
         """Create an overall summary report in Markdown format."""
-        with open(f"{self.output_dir}/overall_summary.md", 'w') as f:
+        parts: List[str] = [
             # Header
-            f.write("# Overall Activity Summary\n\n")
-            f.write(
-                f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")  # noqa
+            "# Overall Activity Summary\n\n",
+            f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n",  # noqa
 
             # Summary table header
-            f.write(
-                "| Repository | Commits | Activity Time | Active Days | Lines Added | Lines Deleted |\n")  # noqa
-            f.write(
-                "|------------|---------|---------------|-------------|-------------|---------------|\n")   # noqa
-
-            # Calculate totals
-            total_commits = 0
-            total_minutes = 0
-            total_additions = 0
-            total_deletions = 0
-
-            for repo_name, daily_stats in repo_stats.items():
-                commits = daily_stats['commits'].sum()
-                minutes = daily_stats['activity_minutes'].sum()
-                days = len(daily_stats)
-                additions = daily_stats['additions'].sum()
-                deletions = daily_stats['deletions'].sum()
-
-                # Add to totals
-                total_commits += commits
-                total_minutes += minutes
-                total_additions += additions
-                total_deletions += deletions
-
-                # Write repository row
-                f.write(f"| {repo_name} | {commits:,} | {minutes:,} | {
-                        days:,} | {additions:,} | {deletions:,} |\n")
-
-            # Write totals row
-            f.write(f"| **TOTAL** | **{total_commits:,}** | **{total_minutes:,}** | **-** | **{  # noqa
-                    total_additions:,}** | **{total_deletions:,}** |\n\n")
-
-            # Detailed Statistics Section
-            f.write("## Detailed Repository Statistics\n\n")
-
-            for repo_name, daily_stats in repo_stats.items():
-                f.write(f"### {repo_name}\n\n")
-
-                # Calculate repository metrics
-                total_days = len(daily_stats)
-                active_days_list = daily_stats.index.tolist()  # noqa
-                avg_commits_per_day = daily_stats['commits'].mean()
-                max_commits_day = daily_stats.loc[daily_stats['commits'].idxmax()]  # noqa
-
-                # Write detailed stats
-                f.write("#### Activity Metrics\n\n")
-                f.write("| Metric | Value |\n")
-                f.write("|--------|-------|\n")
-                f.write(f"| Total Active Days | {total_days:,} |\n")
-                f.write(f"| Average Commits per Day | {
-                        avg_commits_per_day:.2f} |\n")
-                f.write(f"| Most Active Day | {max_commits_day.name} ({
-                        max_commits_day['commits']} commits) |\n")
-                f.write("\n---\n\n")
+            "| Repository | Commits | Activity Time | Active Days | Lines Added | Lines Deleted |\n"  # noqa
+            "|------------|---------|---------------|-------------|-------------|---------------|\n"  # noqa
+            if self.line_stats else
+            "| Repository | Commits | Activity Time | Active Days |\n"
+            "|------------|---------|---------------|-------------|\n",
+        ]
+
+        # Calculate totals
+        total_commits = 0
+        total_minutes = 0
+        total_additions = 0
+        total_deletions = 0
+        details: List[str] = []
+
+        for repo_name, totals in repo_totals.items():
+            commits = totals['commits']
+            minutes = totals['activity_minutes']
+            days = totals['active_days']
+            additions = totals['additions']
+            deletions = totals['deletions']
+
+            # Add to totals
+            total_commits += commits
+            total_minutes += minutes
+            total_additions += additions
+            total_deletions += deletions
+
+            # Repository row
+            line_cells = f" {additions:,} | {deletions:,} |" \
+                if self.line_stats else ""
+            parts.append(f"| {repo_name} | {commits:,} | {minutes:,} | {
+                         days:,} |{line_cells}\n")
+
+            # Repository metrics for the detailed section
+            details.append(
+                f"### {repo_name}\n\n"
+                "#### Activity Metrics\n\n"
+                "| Metric | Value |\n"
+                "|--------|-------|\n"
+                f"| Total Active Days | {days:,} |\n"
+                f"| Average Commits per Day | {
+                    totals['avg_commits_per_day']:.2f} |\n"
+                f"| Most Active Day | {totals['most_active_day']} ({
+                    totals['most_active_day_commits']} commits) |\n"
+                "\n---\n\n"
+            )
+
+        # Totals row
+        line_cells = f" **{total_additions:,}** | **{total_deletions:,}** |" \
+            if self.line_stats else ""
+        parts.append(f"| **TOTAL** | **{total_commits:,}** | **{total_minutes:,}** | **-** |{line_cells}\n\n")  # noqa
+
+        # Detailed Statistics Section
+        parts.append("## Detailed Repository Statistics\n\n")
+        parts.extend(details)
+
+        with open(f"{self.output_dir}/overall_summary.md", 'w') as f:
+            f.write("".join(parts))
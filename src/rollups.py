@@ -0,0 +1,285 @@
+# File: src/rollups.py
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .commit_store import CommitStore
+from .dedup import CommitDeduplicator
+
+PERIODS = ('day', 'week', 'month')
+GROUP_BY_FIELDS = ('project', 'author') + PERIODS
+MEASURES = ('commits', 'additions', 'deletions', 'total_changes',
+            'activity_minutes')
+# Activity is stored unrounded, in seconds
+COLUMNS = MEASURES[:-1] + ('activity_seconds',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    project TEXT NOT NULL,
+    author_email TEXT NOT NULL,
+    commits INTEGER NOT NULL,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    total_changes INTEGER NOT NULL,
+    activity_seconds INTEGER NOT NULL,
+    PRIMARY KEY (period, period_start, project, author_email)
+);
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Map a day's period_start (YYYY-MM-DD) to the start of its bucket;
+# weeks start on Monday
+BUCKET_SQL = {
+    'day': "period_start",
+    'week': "date(period_start, '-6 days', 'weekday 1')",
+    'month': "strftime('%Y-%m-01', period_start)",
+}
+
+
+def _full_periods(period: str, start: date, end: date) -> Tuple[date, date]:
+    """Return [first, stop) of the period starts lying wholly in the range."""
+    after_end = end + timedelta(days=1)
+    if period == 'month':
+        first = start if start.day == 1 else \
+            (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        stop = after_end.replace(day=1)
+    elif period == 'week':
+        first = start + timedelta(days=-start.weekday() % 7)
+        stop = after_end - timedelta(days=after_end.weekday())
+    else:
+        first, stop = start, after_end
+    return first, max(first, stop)
+
+
+def _round_minutes(seconds: float) -> int:
+    """Round seconds to minutes half to even, like the reports."""
+    return round(seconds / 60)
+
+
+class RollupIndex:
+    """Day, week and month totals per project and author.
+
+    The rollups live next to the commits in the commit store's SQLite
+    file. After each sync, the projects whose stored commits changed are
+    rebuilt from them, leaving out copies flagged as duplicates like the
+    reports do.
+    Range queries then read whole months or weeks from their rollups and
+    only the partial periods at the edges from the daily ones, without
+    touching the commits. Activity is rounded to minutes per project and
+    day at query time, the way the reports round it, so it is always
+    read from the daily rollups.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function('round_minutes', 1, _round_minutes,
+                                  deterministic=True)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self.conn.execute(
+                "PRAGMA table_info(rollups)")}
+            if 'activity_seconds' not in columns:
+                # Rollups built with rounded minutes are rebuilt in full
+                self.conn.execute("DROP TABLE rollups")
+                self.conn.execute("DELETE FROM rollup_meta")
+                self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def refresh(self, project_ids: Optional[Sequence[int]],
+                minutes_per_commit: int = 15):
+        """Rebuild the rollups of the given projects from stored commits.
+
+        All projects are rebuilt when `project_ids` is None or when
+        `minutes_per_commit` differs from the one the rollups were built
+        with.
+        """
+        import pandas as pd
+        from .data_processor import merge_activity_sessions
+
+        built_with = self.conn.execute(
+            "SELECT value FROM rollup_meta WHERE key = 'minutes_per_commit'"
+        ).fetchone()
+        if built_with is None or \
+                int(built_with['value']) != minutes_per_commit:
+            project_ids = None
+
+        paths = {row['project_id']: row['path_with_namespace']
+                 for row in self.conn.execute(
+                     "SELECT DISTINCT project_id, path_with_namespace "
+                     "FROM sync_state")}
+        if project_ids is None:
+            project_ids = list(paths)
+        project_ids = [project_id for project_id in project_ids
+                       if project_id in paths]
+
+        with self.conn:
+            for project_id in project_ids:
+                project = paths[project_id]
+                commits_df = pd.read_sql_query(
+                    "SELECT epoch, additions, deletions, total_changes, "
+                    "author_email FROM commits "
+                    "WHERE project_id = ? AND NOT duplicate",
+                    self.conn, params=(project_id,))
+                self.conn.execute(
+                    "DELETE FROM rollups WHERE project = ?", (project,))
+                self.conn.execute(
+                    "DELETE FROM stale_rollups WHERE project_id = ?",
+                    (project_id,))
+                if commits_df.empty:
+                    continue
+
+                commits_df['project'] = project
+                commits_df['author_email'] = \
+                    commits_df['author_email'].str.lower()
+                commits_df['activity_end'] = pd.to_datetime(
+                    commits_df['epoch'], unit='s', utc=True)
+                commits_df['activity_start'] = commits_df['activity_end'] - \
+                    pd.Timedelta(minutes=minutes_per_commit)
+                commits_df['date'] = commits_df['activity_end'].dt.date
+
+                daily = commits_df.groupby(
+                    ['project', 'date', 'author_email'], sort=False
+                ).agg(
+                    commits=('epoch', 'count'),
+                    additions=('additions', 'sum'),
+                    deletions=('deletions', 'sum'),
+                    total_changes=('total_changes', 'sum')
+                )
+                daily['activity_seconds'] = merge_activity_sessions(
+                    commits_df, by_author=True, seconds=True
+                ).round().reindex(daily.index, fill_value=0)
+                self.conn.executemany(
+                    "INSERT INTO rollups VALUES "
+                    "('day', ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(day.isoformat(), project, author, *map(int, values))
+                     for (_, day, author), values in zip(
+                         daily.index, daily[list(COLUMNS)].to_numpy())])
+
+                for period in PERIODS[1:]:
+                    self.conn.execute(
+                        f"INSERT INTO rollups SELECT ?, {BUCKET_SQL[period]}, "
+                        "project, author_email, SUM(commits), "
+                        "SUM(additions), SUM(deletions), SUM(total_changes), "
+                        "SUM(activity_seconds) FROM rollups "
+                        "WHERE period = 'day' AND project = ? "
+                        "GROUP BY 2, 3, 4", (period, project))
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rollup_meta VALUES "
+                "('minutes_per_commit', ?)", (str(minutes_per_commit),))
+
+    def query(self, start: str, end: str,
+              group_by: Sequence[str] = ('project',),
+              projects: Sequence[str] = (),
+              authors: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Return totals between two dates (inclusive) per group.
+
+        `group_by` takes any of project, author, day, week and month.
+        Projects and authors can be restricted to the given names and
+        emails.
+        """
+        unknown = set(group_by) - set(GROUP_BY_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot group by: {', '.join(sorted(unknown))}")
+        periods = [field for field in group_by if field in PERIODS]
+        if len(periods) > 1:
+            raise ValueError("Group by at most one of day, week and month")
+
+        # Read the coarsest rollup that still gives the requested buckets
+        period = periods[0] if periods else 'month'
+        first, stop = _full_periods(
+            period, date.fromisoformat(start), date.fromisoformat(end))
+
+        filters = ""
+        params: List[Any] = []
+        if projects:
+            filters += f" AND project IN ({', '.join('?' * len(projects))})"
+            params += list(projects)
+        if authors:
+            filters += \
+                f" AND author_email IN ({', '.join('?' * len(authors))})"
+            params += [author.lower() for author in authors]
+
+        columns = {'project': 'project', 'author': 'author_email',
+                   period: 'bucket'}
+        selected = [f"{columns[field]} AS {field}" for field in group_by]
+        counts = MEASURES[:-1]
+        measures = [f"SUM({measure}) AS {measure}" for measure in counts]
+        grouping = ""
+        if group_by:
+            order = ', '.join(str(index + 1)
+                              for index in range(len(group_by)))
+            grouping = f" GROUP BY {order} ORDER BY {order}"
+        sql = (
+            "WITH parts AS ("
+            f" SELECT project, author_email, period_start AS bucket, "
+            f"{', '.join(counts)} FROM rollups"
+            " WHERE period = ? AND period_start >= ? AND period_start < ?"
+            f"{filters}"
+            " UNION ALL"
+            f" SELECT project, author_email, {BUCKET_SQL[period]} AS bucket,"
+            f" {', '.join(counts)} FROM rollups"
+            " WHERE period = 'day' AND period_start BETWEEN ? AND ?"
+            " AND NOT (period_start >= ? AND period_start < ?)"
+            f"{filters})"
+            f" SELECT {', '.join(selected + measures)} FROM parts{grouping}"
+        )
+
+        # The reports round each project's day, per author when split by
+        # author, so minutes are rounded at that grain and then summed
+        day_keys = ['project', 'period_start']
+        if 'author' in group_by or authors:
+            day_keys.append('author_email')
+        activity_sql = (
+            "WITH days AS ("
+            f" SELECT project, author_email, {BUCKET_SQL[period]} AS bucket,"
+            " round_minutes(SUM(activity_seconds)) AS minutes FROM rollups"
+            " WHERE period = 'day' AND period_start BETWEEN ? AND ?"
+            f"{filters} GROUP BY {', '.join(day_keys)})"
+            f" SELECT {', '.join(selected)}{', ' if selected else ''}"
+            f"SUM(minutes) AS activity_minutes FROM days{grouping}"
+        )
+
+        first, stop = first.isoformat(), stop.isoformat()
+        rows = self.conn.execute(
+            sql, [period, first, stop, *params,
+                  start, end, first, stop, *params]).fetchall()
+        minutes = {tuple(row)[:-1]: row['activity_minutes']
+                   for row in self.conn.execute(
+                       activity_sql, [start, end, *params])}
+        return [dict(row, activity_minutes=minutes.get(
+                    tuple(row)[:len(group_by)], 0))
+                for row in rows if row['commits']]
+
+
+def refresh_rollups(store: CommitStore, projects: List[Dict[str, Any]],
+                    config: Dict[str, Any],
+                    dedup: Optional[CommitDeduplicator] = None):
+    """Flag this run's duplicates and rebuild the rollups that changed.
+
+    Only projects whose stored commits changed since their rollups were
+    built are rebuilt, including any left over from an interrupted run.
+    """
+    for project in projects:
+        store.mark_duplicates(
+            project, config['start_date'], config['author_email'],
+            dedup.dropped.get(project['path_with_namespace'], [])
+            if dedup else [])
+
+    rollups = RollupIndex(store.path)
+    try:
+        stale = store.stale_rollups()
+        rollups.refresh([project['id'] for project in projects
+                         if project['id'] in stale],
+                        config['minutes_per_commit'])
+    finally:
+        rollups.close()
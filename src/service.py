@@ -0,0 +1,331 @@
+# File: src/service.py
+import hmac
+import json
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from .commit_buffer import CommitBuffer
+from .commit_store import SINCE_SLACK, CommitStore, newest_timestamp, to_epoch
+from .data_processor import ActivityDataProcessor
+from .dedup import CommitDeduplicator
+from .gitlab_api import GitLabAPI
+from .metrics import metrics
+from .pipeline import commit_to_row, fetch_all_commits
+from .report_generator import ReportGenerator
+from .rollups import refresh_rollups
+
+
+class MemorySummaryCache:
+    """In-process summary cache used when no cache directory is set."""
+
+    def __init__(self):
+        self._summaries: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self._summaries.get(key)
+
+    def put(self, key: str, summary: str):
+        self._summaries[key] = summary
+
+
+class ActivityService:
+    """Long-running mode that keeps activity reports close to real time.
+
+    After one full sync, commits stay in memory per project and reports
+    are refreshed only for repositories that received new commits. Work
+    arrives from GitLab push webhooks, and from a poll that lists projects
+    active since the previous poll, so missed webhooks are caught up.
+    """
+
+    def __init__(self, gitlab: GitLabAPI, source: Any,
+                 processor: ActivityDataProcessor, reporter: ReportGenerator,
+                 config: Dict[str, Any],
+                 store: Optional[CommitStore] = None,
+                 dedup: Optional[CommitDeduplicator] = None):
+        self.gitlab = gitlab
+        self.source = source
+        self.processor = processor
+        self.reporter = reporter
+        self.config = config
+        self.store = store
+        self.dedup = dedup
+        if processor.summarizer and not processor.summary_cache:
+            processor.summary_cache = MemorySummaryCache()
+
+        self.projects: Dict[int, Dict[str, Any]] = {}
+        self.rows: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self.repo_stats: Dict[str, Any] = {}
+        self.last_refresh: Optional[str] = None
+        self._queue: 'queue.Queue[Tuple[int, Optional[str]]]' = queue.Queue()
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._group_paths: List[str] = []
+
+    def run(self, projects: List[Dict[str, Any]]):
+        """Sync everything once, then serve webhooks until interrupted."""
+        # Pushes to projects created after discovery are checked against
+        # these before they are tracked
+        self._group_paths = [self.gitlab.get_group_info(group_id)['full_path']
+                             for group_id in self.config['group_ids']]
+        results = fetch_all_commits(
+            self.source, projects, self.config, self.store)
+        for project, rows in zip(projects, results):
+            self._track(project)
+            self._add_rows(project, rows or [])
+        self._refresh([project['id'] for project in projects])
+        if self.store:
+            refresh_rollups(self.store, projects, self.config, self.dedup)
+
+        host, _, port = self.config['listen'].rpartition(':')
+        self._server = ThreadingHTTPServer(
+            (host or '127.0.0.1', int(port)), _make_handler(self))
+        threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._work, daemon=True),
+        ]
+        if self.config['poll_interval'] > 0:
+            threads.append(threading.Thread(target=self._poll, daemon=True))
+        for thread in threads:
+            thread.start()
+        print(f"Listening for GitLab push webhooks on {self.config['listen']}")  # noqa
+
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            print("\nShutting down")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop serving and working."""
+        self._stop.set()
+        # run() stops too on its way out, possibly at the same time
+        server, self._server = self._server, None
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    def enqueue(self, project_id: int, since: Optional[str] = None):
+        """Schedule a project update, by default from its newest commits."""
+        self._queue.put((project_id, since))
+
+    def handle_push(self, payload: Dict[str, Any]):
+        """Queue the project of a push event from its earliest commit.
+
+        GitLab lists at most 20 commits per push. When some are missing,
+        the whole sync window is fetched, since the ones left out may be
+        older than any listed; pushes listing none (new branches, tags,
+        deletions) fall back to the usual window.
+        """
+        commits = payload.get('commits') or []
+        timestamps = [commit['timestamp'] for commit in commits
+                      if commit.get('timestamp')]
+        since = None
+        if payload.get('total_commits_count', 0) > len(commits):
+            since = self.config['start_date']
+        elif timestamps:
+            earliest = min(timestamps, key=to_epoch)
+            since = (datetime.fromtimestamp(to_epoch(earliest), timezone.utc)
+                     - SINCE_SLACK).isoformat()
+        metrics.increment('webhook_pushes')
+        self.enqueue(payload['project_id'], since)
+
+    def status(self) -> Dict[str, Any]:
+        """Return counts for the health endpoint."""
+        return {
+            'projects': len(self.projects),
+            'commits': sum(len(rows) for rows in list(self.rows.values())),
+            'last_refresh': self.last_refresh,
+            'pending': self._queue.qsize(),
+        }
+
+    def _track(self, project: Dict[str, Any]):
+        self.projects[project['id']] = project
+        self.rows.setdefault(project['id'], {})
+
+    def _add_rows(self, project: Dict[str, Any],
+                  rows: List[Dict[str, Any]]) -> int:
+        """Add rows not yet known for the project, returning how many.
+
+        With a deduplicator, rows already kept for another project (or,
+        in patch-id mode, another copy of the same change) are skipped,
+        so the first project to report a commit keeps it.
+        """
+        known = self.rows[project['id']]
+        added = 0
+        for row in rows:
+            if row['commit_id'] in known or \
+                    (self.dedup and not self.dedup.is_new(row)):
+                continue
+            known[row['commit_id']] = row
+            added += 1
+        return added
+
+    def _work(self):
+        """Apply queued updates, coalescing bursts of pushes."""
+        while not self._stop.is_set():
+            try:
+                pending = [self._queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # One fetch per project, from the earliest requested point
+            updates: Dict[int, Optional[str]] = {}
+            for project_id, since in pending:
+                if project_id in updates:
+                    candidates = [s for s in (updates[project_id], since) if s]
+                    since = min(candidates, key=to_epoch) \
+                        if candidates else None
+                updates[project_id] = since
+
+            try:
+                changed = [project_id
+                           for project_id, since in updates.items()
+                           if self._update_project(project_id, since)]
+                if changed:
+                    self._refresh(changed)
+                if changed and self.store:
+                    refresh_rollups(self.store, [
+                        self.projects[project_id] for project_id in changed],
+                        self.config, self.dedup)
+            except Exception as e:
+                print(f"Error applying updates: {str(e)}")
+
+    def _resolve_project(self, project_id: int
+                         ) -> Optional[Dict[str, Any]]:
+        """Return a tracked project, tracking it first if it is new.
+
+        Projects created after discovery, or pruned by the author
+        prefilter, are looked up and tracked when they belong to one of
+        the configured groups.
+        """
+        project = self.projects.get(project_id)
+        if project is not None:
+            return project
+
+        project = self.gitlab.get_project(project_id)
+        namespace = (project or {}).get('namespace', {}).get('full_path', '')
+        if not project or project.get('archived') or not any(
+                namespace == path or namespace.startswith(f"{path}/")
+                for path in self._group_paths):
+            self.gitlab.debug_print(f"Ignoring push to project {project_id} outside the configured groups")  # noqa
+            return None
+        self._track(project)
+        print(f"Tracking new project {project['path_with_namespace']}")
+        return project
+
+    def _update_project(self, project_id: int, since: Optional[str]) -> bool:
+        """Fetch a project's new commits, returning True if any arrived.
+
+        Fetches start at `since` or the lookback window before the newest
+        known commit, whichever is earlier.
+        """
+        project = self._resolve_project(project_id)
+        if project is None:
+            return False
+
+        known = self.rows[project_id].values()
+        newest = newest_timestamp(known)
+        window = self.config['start_date']
+        if newest:
+            window = (datetime.fromtimestamp(to_epoch(newest), timezone.utc)
+                      - timedelta(hours=self.config['store_lookback_hours'])
+                      ).isoformat()
+        if not since or to_epoch(window) < to_epoch(since):
+            since = window
+        if to_epoch(since) < to_epoch(self.config['start_date']):
+            since = self.config['start_date']
+
+        rows = [commit_to_row(project, commit)
+                for commit in self.source.get_project_commits(
+                    project, since, self.config['author_email'])]
+        added = self._add_rows(project, rows)
+        if self.store and rows:
+            self.store.save_commits(project, rows, self.config['start_date'],
+                                    self.config['author_email'])
+        self.gitlab.debug_print(f"{added} new commits in {project['path_with_namespace']}")  # noqa
+        metrics.increment('service_new_commits', added)
+        return added > 0
+
+    def _refresh(self, project_ids: List[int]):
+        """Re-aggregate the given projects and refresh their reports."""
+        commits = CommitBuffer()
+        for project_id in project_ids:
+            commits.extend(self.rows[project_id].values())
+        if not len(commits):
+            return
+
+        commits_df, repo_stats = self.processor.process_commits(
+            commits, self.config['minutes_per_commit'])
+        self.repo_stats.update(repo_stats)
+        # Incremental reports skip repos whose daily stats did not change
+        self.reporter.generate_reports(commits_df, self.repo_stats)
+        self.last_refresh = datetime.now(timezone.utc).isoformat()
+        print(f"Refreshed reports for {len(repo_stats)} repositories")
+
+    def _poll(self):
+        """Periodically queue projects active since the previous poll."""
+        last_poll = datetime.now(timezone.utc)
+        while not self._stop.wait(self.config['poll_interval']):
+            started = datetime.now(timezone.utc)
+            try:
+                after = (last_poll - SINCE_SLACK).isoformat()
+                for group_id in self.config['group_ids']:
+                    for project in self.gitlab.get_group_projects(
+                            group_id, after):
+                        self._track(project)
+                        self.enqueue(project['id'])
+                last_poll = started
+                metrics.increment('service_polls')
+            except Exception as e:
+                print(f"Error polling for activity: {str(e)}")
+
+
+def _make_handler(service: ActivityService):
+    secret = service.config['webhook_secret']
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            service.gitlab.debug_print(format % args)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self._send(404, {'message': 'Not Found'})
+            self._send(200, service.status())
+
+        def do_POST(self):
+            if self.path != '/webhook':
+                return self._send(404, {'message': 'Not Found'})
+            token = self.headers.get('X-Gitlab-Token', '')
+            if secret and not hmac.compare_digest(token, secret):
+                return self._send(401, {'message': 'Invalid token'})
+
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._send(400, {'message': 'Invalid JSON'})
+
+            if self.headers.get('X-Gitlab-Event') != 'Push Hook' or \
+                    'project_id' not in payload:
+                return self._send(202, {'message': 'Ignored'})
+            service.handle_push(payload)
+            self._send(202, {'message': 'Queued'})
+
+        def _send(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return WebhookHandler
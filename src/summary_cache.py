@@ -0,0 +1,105 @@
+# File: src/summary_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+
+class SummaryCache:
+    """On-disk cache of AI commit summaries keyed by a hash of their inputs.
+
+    Entries not read for `max_age_days` are dropped, and once the cache
+    grows past `max_bytes` the least recently used entries are evicted
+    first. Eviction runs on start and again every `evict_every` writes,
+    so long-running processes stay within the limits too.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 100 * 1024 * 1024,
+                 max_age_days: float = 90, evict_every: int = 100):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def key(commit_messages: List[str], model: str,
+            instructions: str) -> str:
+        """Return the cache key for a summary request."""
+        digest = hashlib.sha256()
+        for part in (model, instructions, " ".join(commit_messages)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached summary, or None on a miss."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                summary = json.load(f)['summary']
+            # Refresh the access time used for LRU eviction
+            os.utime(path)
+            return summary
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, summary: str):
+        """Store a summary."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'summary': summary}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Remove expired entries, then the oldest ones until under size."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                _remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
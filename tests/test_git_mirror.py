@@ -0,0 +1,135 @@
+# File: tests/test_git_mirror.py
+"""GitMirror against a throwaway local repository; needs only git."""
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from src.dedup import CommitDeduplicator
+from src.git_mirror import GitMirror, parse_log
+from src.pipeline import commit_to_row
+
+GIT_ENV = {
+    'GIT_AUTHOR_NAME': 'Alice Example',
+    'GIT_AUTHOR_EMAIL': 'alice@example.com',
+    'GIT_COMMITTER_NAME': 'Alice Example',
+    'GIT_COMMITTER_EMAIL': 'alice@example.com',
+    'GIT_CONFIG_GLOBAL': os.devnull,
+    'GIT_CONFIG_NOSYSTEM': '1',
+}
+
+
+@unittest.skipUnless(shutil.which('git'), "git is not installed")
+class GitMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.work = os.path.join(self.tmp, 'work')
+        os.makedirs(self.work)
+        self.git('init', '--quiet', '--initial-branch=main')
+
+        self.write('notes.txt', "one\ntwo\nthree\n")
+        self.commit('Add notes', '2024-03-01T10:00:00+00:00')
+        with open(os.path.join(self.work, 'logo.bin'), 'wb') as f:
+            f.write(bytes(range(256)) * 4)
+        self.write('notes.txt', "one\ntwo\nthree\nfour\n")
+        self.commit('Add logo\n\nBinary file plus one more line.',
+                    '2024-03-02T10:00:00+00:00')
+
+        self.git('checkout', '--quiet', '-b', 'feature')
+        self.write('feature.txt', "a\nb\n")
+        self.commit('Add feature', '2024-03-03T10:00:00+00:00')
+        self.git('checkout', '--quiet', 'main')
+        self.git('cherry-pick', 'feature',
+                 date='2024-03-04T10:00:00+00:00')
+
+        self.project = {'id': 1, 'path_with_namespace': 'local/work',
+                        'http_url_to_repo': self.work}
+
+    def git(self, *args, date='2024-01-01T00:00:00+00:00'):
+        env = dict(os.environ, GIT_AUTHOR_DATE=date,
+                   GIT_COMMITTER_DATE=date, **GIT_ENV)
+        return subprocess.run(['git', '-C', self.work, *args], env=env,
+                              check=True, capture_output=True, text=True)
+
+    def write(self, name, text):
+        with open(os.path.join(self.work, name), 'w') as f:
+            f.write(text)
+
+    def commit(self, message, date):
+        self.git('add', '-A')
+        self.git('commit', '--quiet', '-m', message, date=date)
+
+    def mirror(self, patch_ids=False):
+        return GitMirror(os.path.join(self.tmp, 'mirrors'),
+                         patch_ids=patch_ids)
+
+    def test_commits_and_stats(self):
+        listed = self.mirror().get_project_commits(self.project)
+        self.assertEqual(len(listed), 4)
+        commits = {c['title']: c for c in listed}
+
+        self.assertEqual(commits['Add notes']['stats'],
+                         {'additions': 3, 'deletions': 0, 'total': 3})
+        # The binary file's "-" counts are ignored, the text line is not
+        logo = commits['Add logo']
+        self.assertEqual(logo['stats'],
+                         {'additions': 1, 'deletions': 0, 'total': 1})
+        self.assertEqual(logo['message'],
+                         'Add logo\n\nBinary file plus one more line.')
+        self.assertEqual(logo['author_email'], 'alice@example.com')
+        self.assertEqual(logo['created_at'], '2024-03-02T10:00:00+00:00')
+
+    def test_since_and_incremental_fetch(self):
+        mirror = self.mirror()
+        self.assertEqual(len(mirror.get_project_commits(
+            self.project, since='2024-03-03T00:00:00+00:00')), 2)
+
+        self.write('notes.txt', "one\n")
+        self.commit('Trim notes', '2024-03-05T10:00:00+00:00')
+        newest = mirror.get_project_commits(
+            self.project, since='2024-03-05T00:00:00+00:00')
+        self.assertEqual([c['title'] for c in newest], ['Trim notes'])
+        self.assertEqual(newest[0]['stats']['deletions'], 3)
+
+    def test_cherry_pick_dedup(self):
+        rows = [commit_to_row(self.project, commit) for commit in
+                self.mirror(patch_ids=True).get_project_commits(
+                    self.project)]
+        picks = [row for row in rows if row['message'] == 'Add feature']
+        self.assertEqual(len(picks), 2)
+        self.assertNotEqual(picks[0]['commit_id'], picks[1]['commit_id'])
+        self.assertEqual(picks[0]['patch_id'], picks[1]['patch_id'])
+
+        self.assertEqual(
+            len(list(CommitDeduplicator('sha').filter(rows))), 4)
+        self.assertEqual(
+            len(list(CommitDeduplicator('patch-id').filter(rows))), 3)
+
+    def test_parse_log_separators(self):
+        from src.git_mirror import FIELD, RECORD
+        output = [
+            f"{RECORD}abc{FIELD}Bob{FIELD}bob@example.com{FIELD}"
+            f"2024-01-01T00:00:00Z{FIELD}2024-01-02T00:00:00Z{FIELD}"
+            "Title\n",
+            "\n",
+            "Body with a\ttab\n",
+            f"{FIELD}\n",
+            "\n",
+            "2\t1\tsrc/a.py\n",
+            "-\t-\timage.png\n",
+            f"{RECORD}def{FIELD}Bob{FIELD}bob@example.com{FIELD}"
+            f"2024-01-03T00:00:00Z{FIELD}2024-01-03T00:00:00Z{FIELD}"
+            f"Empty\n{FIELD}\n",
+        ]
+        first, second = parse_log(output)
+        self.assertEqual(first['message'], "Title\n\nBody with a\ttab")
+        self.assertEqual(first['stats'],
+                         {'additions': 2, 'deletions': 1, 'total': 3})
+        self.assertEqual(first['authored_date'], '2024-01-01T00:00:00Z')
+        self.assertEqual(second['id'], 'def')
+        self.assertEqual(second['stats']['total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# File: tests/test_service.py
+"""ActivityService end to end against the mock GitLab server."""
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from benchmarks.mock_gitlab import MockGitLabServer, SyntheticGroup
+from benchmarks.send_webhook import push_payload
+from src.data_processor import ActivityDataProcessor
+from src.gitlab_api import GitLabAPI
+from src.main import parse_args
+from src.report_generator import ReportGenerator
+from src.service import ActivityService
+
+SECRET = 's3cret'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ActivityServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.group = SyntheticGroup(3, 20)
+        self.mock = MockGitLabServer(self.group).__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+        self.url = f"http://127.0.0.1:{free_port()}"
+        self.prefix = os.path.join(self.tmp, 'activity')
+        config = parse_args([
+            '--token', 'test', '--group-id', '1',
+            '--gitlab-url', self.mock.url, '--start-date', '2024-01-01',
+            '--output-prefix', self.prefix, '--serve',
+            '--listen', self.url[len('http://'):],
+            '--webhook-secret', SECRET, '--poll-interval', '0'])
+        gitlab = GitLabAPI(config['token'], config['gitlab_url'])
+        self.service = ActivityService(
+            gitlab, gitlab, ActivityDataProcessor(),
+            ReportGenerator(self.prefix, incremental=True), config)
+        self.addCleanup(gitlab.close)
+
+        # Project 3 is left out, as if it was created after discovery
+        thread = threading.Thread(target=self.service.run,
+                                  args=(self.group.projects[:2],),
+                                  daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.service.stop)
+        self.wait_for(lambda: self.health() is not None)
+
+    def health(self):
+        try:
+            with urllib.request.urlopen(f"{self.url}/health") as response:
+                return json.load(response)
+        except OSError:
+            return None
+
+    def push(self, payload, token=SECRET) -> int:
+        request = urllib.request.Request(
+            f"{self.url}/webhook", data=json.dumps(payload).encode('utf-8'),
+            headers={'X-Gitlab-Event': 'Push Hook',
+                     'X-Gitlab-Token': token},
+            method='POST')
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out waiting for the service")
+            time.sleep(0.05)
+
+    def add_commit(self, project_id, sha, created_at):
+        commits = self.group.commits(project_id)
+        commit = dict(commits[0], id=sha, created_at=created_at,
+                      authored_date=created_at, committed_date=created_at)
+        commits.append(commit)
+        commits.sort(key=lambda c: c['created_at'], reverse=True)
+
+    def detailed_report(self, project_id):
+        path = os.path.join(f"{self.prefix}_by_repo",
+                            f"bench_project-{project_id}_detailed.csv")
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_initial_sync(self):
+        self.assertEqual(self.health()['projects'], 2)
+        self.assertEqual(self.health()['commits'], 40)
+
+    def test_rejects_invalid_token(self):
+        self.add_commit(1, 'a' * 40, '2024-07-01T10:00:00+00:00')
+        status = self.push(
+            push_payload(1, '2024-07-01T10:00:00+00:00'), token='wrong')
+        self.assertEqual(status, 401)
+        self.assertEqual(self.health()['pending'], 0)
+        self.assertNotIn('a' * 40, self.service.rows[1])
+
+    def test_push_refreshes_reports(self):
+        refreshed = self.health()['last_refresh']
+        self.add_commit(1, 'b' * 40, '2024-07-01T10:00:00+00:00')
+        status = self.push(push_payload(1, '2024-07-01T10:00:00+00:00'))
+        self.assertEqual(status, 202)
+        self.wait_for(lambda: self.health()['last_refresh'] != refreshed)
+        self.assertEqual(self.health()['commits'], 41)
+        self.assertIn('b' * 40, self.detailed_report(1))
+
+    def test_push_to_untracked_project(self):
+        status = self.push(push_payload(3, '2024-07-01T10:00:00+00:00'))
+        self.assertEqual(status, 202)
+        self.wait_for(lambda: self.health()['commits'] == 60)
+        self.assertEqual(self.health()['projects'], 3)
+        self.assertEqual(len(self.service.rows[3]), 20)
+
+    def test_push_outside_configured_groups(self):
+        self.group.projects.append(dict(
+            self.group.projects[2], id=4,
+            path_with_namespace='other/project-4',
+            namespace={'id': 2, 'full_path': 'other'}))
+        self.push(push_payload(4, '2024-07-01T10:00:00+00:00'))
+        self.push(push_payload(3, '2024-07-01T10:00:00+00:00'))
+        self.wait_for(lambda: self.health()['projects'] == 3)
+        self.assertNotIn(4, self.service.projects)
+
+    def test_truncated_push_fetches_older_commits(self):
+        # GitLab only lists the newest commits of a large push
+        refreshed = self.health()['last_refresh']
+        self.add_commit(1, 'c' * 40, '2024-01-02T10:00:00+00:00')
+        self.add_commit(1, 'd' * 40, '2024-07-01T10:00:00+00:00')
+        payload = push_payload(1, '2024-07-01T10:00:00+00:00')
+        payload['total_commits_count'] = 2
+        self.push(payload)
+        self.wait_for(lambda: self.health()['last_refresh'] != refreshed)
+        self.assertEqual(self.health()['commits'], 42)
+        self.assertIn('c' * 40, self.service.rows[1])
+        self.assertIn('c' * 40, self.detailed_report(1))
+
+
+if __name__ == '__main__':
+    unittest.main()